@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Measure how rendering with :py:func:`libsidplayfp.batch.render_threaded`
+scales with the number of threads.
+
+Usage: bench_threads.py [-s SECONDS] [-t MAX_THREADS] TUNE [TUNE ...]
+
+Prints one JSON object per thread count.
+"""
+import argparse
+import json
+import os
+import time
+
+from libsidplayfp.batch import render_threaded
+
+
+def _length(samples):
+    return len(samples)
+
+
+def run(tunes, seconds, threads, frequency=44100):
+    start = time.perf_counter()
+    samples = 0
+    errors = 0
+    for result in render_threaded(tunes, seconds, threads, handler=_length,
+                                  frequency=frequency):
+        if result.error is None:
+            samples += result.result
+        else:
+            errors += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        'benchmark': 'render_threaded',
+        'threads': threads,
+        'tunes': len(tunes),
+        'errors': errors,
+        'seconds': elapsed,
+        'samples_per_second': samples / elapsed,
+        'realtime_factor': samples / frequency / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('tunes', nargs='+')
+    parser.add_argument('-s', '--seconds', type=float, default=10)
+    parser.add_argument('-t', '--max-threads', type=int,
+                        default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    threads = 1
+    while threads <= args.max_threads:
+        print(json.dumps(run(args.tunes, args.seconds, threads)))
+        threads *= 2
+
+
+if __name__ == '__main__':
+    main()
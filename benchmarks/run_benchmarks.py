@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Measure rendering throughput and the overhead of the wrapper.
+
+Usage: run_benchmarks.py [-s SECONDS] [-r REPEAT] [-o OUTPUT] [NAME ...]
+
+All benchmarks use synthetic tunes generated by synth.py, so no tunes have
+to be provided. Results are printed as one JSON object per line, starting
+with a description of the environment. If NAMEs are given, only those
+benchmarks are run.
+"""
+import argparse
+import datetime
+import importlib.metadata
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+
+from libsidplayfp import SidTune, SidDatabase, Playback, SamplingMethod
+from libsidplayfp.batch import create_player
+from libsidplayfp.scan import scan_tune
+from libsidplayfp.songlength import SongLengthIndex
+
+from synth import write_tunes
+
+
+FREQUENCY = 44100
+
+BUFFER_SIZES = (256, 1024, 4096, 16384, 65536)
+
+TUNE_INFO_PROPERTIES = (
+    'load_addr', 'init_addr', 'play_addr', 'songs', 'start_song',
+    'current_song', 'sid_chips', 'song_speed', 'format_string',
+    'info_strings', 'sid_models', 'sid_chip_bases')
+
+# modules imported by the import_time benchmark, from metadata-only use to
+# the full wrapper
+IMPORT_MODULES = (
+    'libsidplayfp', 'libsidplayfp.songlength', 'libsidplayfp.archive',
+    'libsidplayfp.libsidplayfp')
+
+_IMPORT_SCRIPT = """\
+import sys, time
+start = time.perf_counter()
+import {}
+elapsed = time.perf_counter() - start
+print(elapsed, 'libsidplayfp._libsidplayfp' in sys.modules)
+"""
+
+_BENCHMARKS = []
+
+
+def benchmark(func):
+    _BENCHMARKS.append(func)
+    return func
+
+
+def best_of(repeat, func, *args):
+    """Call ``func`` ``repeat`` times and return the shortest time taken."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _render_result(name, elapsed, seconds, **params):
+    result = {'benchmark': name}
+    result.update(params)
+    result.update({
+        'seconds': elapsed,
+        'frames_per_second': seconds * FREQUENCY / elapsed,
+        'realtime_factor': seconds / elapsed,
+    })
+    return result
+
+
+@benchmark
+def play_buffer(ctx):
+    """SidPlayfp.play() with different buffer sizes."""
+    for playback in (Playback.MONO, Playback.STEREO):
+        player = create_player(frequency=FREQUENCY, playback=playback)
+        tune = SidTune(ctx.tunes[1][0])
+        samples = int(ctx.seconds * FREQUENCY) * playback.value
+
+        for size in BUFFER_SIZES:
+            buffer = array('h', bytes(2 * size))
+            calls = max(samples // size, 1)
+
+            def run():
+                player.reset(tune)
+                for _ in range(calls):
+                    player.play(buffer)
+
+            elapsed = best_of(ctx.repeat, run)
+            seconds = calls * size / playback.value / FREQUENCY
+            yield _render_result(
+                'play_buffer', elapsed, seconds,
+                playback=playback.name, buffer_size=size)
+
+
+@benchmark
+def emulation(ctx):
+    """ReSIDfp and ReSID with all sampling options."""
+    tune = SidTune(ctx.tunes[1][0])
+    for emulation in ('residfp', 'resid'):
+        for method in SamplingMethod:
+            for fast_sampling in (False, True):
+                player = create_player(
+                    emulation, frequency=FREQUENCY, sampling_method=method,
+                    fast_sampling=fast_sampling)
+                buffer = array('h', bytes(2 * int(ctx.seconds * FREQUENCY)))
+
+                def run():
+                    player.reset(tune)
+                    player.render(out=buffer)
+
+                elapsed = best_of(ctx.repeat, run)
+                yield _render_result(
+                    'emulation', elapsed, ctx.seconds, emulation=emulation,
+                    sampling_method=method.name, fast_sampling=fast_sampling)
+
+
+@benchmark
+def sids(ctx):
+    """Tunes using one, two and three sid chips."""
+    player = create_player(frequency=FREQUENCY)
+    buffer = array('h', bytes(2 * int(ctx.seconds * FREQUENCY)))
+    for sids, paths in sorted(ctx.tunes.items()):
+        tune = SidTune(paths[0])
+
+        def run():
+            player.reset(tune)
+            player.render(out=buffer)
+
+        elapsed = best_of(ctx.repeat, run)
+        yield _render_result('sids', elapsed, ctx.seconds, sids=sids)
+
+
+@benchmark
+def tune_load(ctx):
+    """Loading a SidTune from a file and from a buffer."""
+    paths = ctx.tunes[1]
+    buffers = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            buffers.append(f.read())
+
+    def from_file():
+        for path in paths:
+            SidTune(path)
+
+    def from_buffer():
+        for buffer in buffers:
+            SidTune(source_buffer=buffer)
+
+    for source, func in (('file', from_file), ('buffer', from_buffer)):
+        elapsed = best_of(ctx.repeat, func)
+        yield {
+            'benchmark': 'tune_load',
+            'source': source,
+            'tunes': len(paths),
+            'seconds': elapsed,
+            'us_per_tune': elapsed / len(paths) * 1e6,
+        }
+
+
+@benchmark
+def tune_info(ctx):
+    """Cost of reading SidTuneInfo properties."""
+    tune = SidTune(ctx.tunes[3][0])
+    info = tune.get_info()
+    count = 10000
+
+    def read(name):
+        for _ in range(count):
+            getattr(info, name)
+
+    for name in TUNE_INFO_PROPERTIES:
+        elapsed = best_of(ctx.repeat, read, name)
+        yield {
+            'benchmark': 'tune_info',
+            'property': name,
+            'seconds': elapsed,
+            'ns_per_access': elapsed / count * 1e9,
+        }
+
+    count //= 10
+
+    def scan():
+        for _ in range(count):
+            scan_tune(tune)
+
+    elapsed = best_of(ctx.repeat, scan)
+    yield {
+        'benchmark': 'tune_info',
+        'property': '<scan_tune>',
+        'seconds': elapsed,
+        'ns_per_access': elapsed / count * 1e9,
+    }
+
+
+@benchmark
+def database(ctx):
+    """Looking up song lengths with SidDatabase and SongLengthIndex."""
+    database = SidDatabase()
+    database.open(os.fsencode(ctx.songlengths))
+    index = SongLengthIndex(ctx.songlengths)
+    tune = SidTune(ctx.tunes[1][0])
+    md5s = ctx.md5s
+    count = len(md5s)
+
+    def lookup(db):
+        for md5 in md5s:
+            db.length(md5, 1)
+
+    def lookup_tune(db):
+        for _ in range(count):
+            db.length(tune)
+
+    cases = (
+        ('SidDatabase', 'md5', lookup, database),
+        ('SidDatabase', 'tune', lookup_tune, database),
+        ('SongLengthIndex', 'md5', lookup, index),
+        ('SongLengthIndex', 'tune', lookup_tune, index),
+        ('SongLengthIndex', 'bulk', index.lengths_ms, md5s),
+    )
+    for implementation, key, func, arg in cases:
+        elapsed = best_of(ctx.repeat, func, arg)
+        yield {
+            'benchmark': 'database',
+            'implementation': implementation,
+            'key': key,
+            'entries': len(index),
+            'seconds': elapsed,
+            'us_per_lookup': elapsed / count * 1e6,
+        }
+
+
+def _import_time(module):
+    """
+    Import ``module`` in a new interpreter. Returns the time taken and
+    whether the compiled extension module was loaded.
+    """
+    output = subprocess.run(
+        [sys.executable, '-c', _IMPORT_SCRIPT.format(module)],
+        stdout=subprocess.PIPE, check=True,
+        universal_newlines=True).stdout.split()
+    return float(output[0]), output[1] == 'True'
+
+
+@benchmark
+def import_time(ctx):
+    """Importing the package and some modules in a fresh interpreter."""
+    for module in IMPORT_MODULES:
+        results = [_import_time(module) for _ in range(ctx.repeat)]
+        yield {
+            'benchmark': 'import_time',
+            'module': module,
+            'seconds': min(elapsed for elapsed, _ in results),
+            'loads_extension': results[0][1],
+        }
+
+
+class Context:
+    """Synthetic tunes and settings shared by all benchmarks."""
+
+    def __init__(self, directory, seconds, repeat, entries=50000):
+        self.seconds = seconds
+        self.repeat = repeat
+
+        self.tunes = {}
+        for sids in (1, 2, 3):
+            self.tunes[sids] = [
+                os.fsencode(path) for path in write_tunes(
+                    os.path.join(directory, 'tunes'), 100, sids, songs=3)]
+
+        # the database contains all synthetic tunes (using both kinds of
+        # MD5s) and random entries to give it a realistic size
+        rng = random.Random(0)
+        md5s = []
+        for paths in self.tunes.values():
+            for path in paths:
+                tune = SidTune(path)
+                md5s.append(tune.create_MD5())
+                md5 = tune.create_MD5_new()
+                if md5 is not None:
+                    md5s.append(md5)
+        while len(md5s) < entries:
+            md5s.append('{:032x}'.format(rng.getrandbits(128)).encode())
+
+        self.songlengths = os.path.join(directory, 'Songlengths.md5')
+        with open(self.songlengths, 'w') as f:
+            f.write('[Database]\n')
+            for md5 in md5s:
+                f.write('{}=0:{:02d}.{:03d} 1:30 2:00\n'.format(
+                    md5.decode(), rng.randrange(60), rng.randrange(1000)))
+
+        self.md5s = rng.sample(md5s, min(len(md5s), 10000))
+
+
+def environment():
+    player = create_player(frequency=FREQUENCY)
+    info = player.info
+    try:
+        version = importlib.metadata.version('libsidplayfp')
+    except importlib.metadata.PackageNotFoundError:
+        version = None
+
+    return {
+        'benchmark': 'environment',
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'cpus': os.cpu_count(),
+        'libsidplayfp': '{} {}'.format(
+            info.name.decode(), info.version.decode()),
+        'libsidplayfp_python': version,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('names', nargs='*', metavar='NAME',
+                        help='benchmarks to run: {}'.format(
+                            ', '.join(f.__name__ for f in _BENCHMARKS)))
+    parser.add_argument('-s', '--seconds', type=float, default=10,
+                        help='seconds of audio rendered per measurement')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='number of measurements, the best one is kept')
+    parser.add_argument('-o', '--output',
+                        help='append results to this file')
+    args = parser.parse_args()
+
+    benchmarks = _BENCHMARKS
+    if args.names:
+        benchmarks = [f for f in _BENCHMARKS if f.__name__ in args.names]
+
+    output = sys.stdout
+    if args.output is not None:
+        output = open(args.output, 'a')
+
+    def emit(result):
+        print(json.dumps(result), file=output, flush=True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        ctx = Context(directory, args.seconds, args.repeat)
+        emit(environment())
+        for func in benchmarks:
+            for result in func(ctx):
+                emit(result)
+
+    if output is not sys.stdout:
+        output.close()
+
+
+if __name__ == '__main__':
+    main()
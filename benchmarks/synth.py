@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Generate synthetic PSID tunes, so benchmarks run without a copy of HVSC.
+
+Usage: synth.py [-n COUNT] [--sids SIDS] [--songs SONGS] DIRECTORY
+
+Each tune plays a sawtooth, a pulse and a triangle wave on every sid and
+changes their frequencies on every frame.
+"""
+import argparse
+import os
+import struct
+
+
+LOAD_ADDR = 0x1000
+
+# the n-th sid is mapped to SID_BASES[n], PSID v4 stores the middle byte
+SID_BASES = (0xd400, 0xd420, 0xd440)
+
+# waveform (with gate bit) of each voice: sawtooth, pulse, triangle
+_WAVEFORMS = (0x21, 0x41, 0x11)
+
+# zero page address of the frame counter used by the play routine, the
+# next byte is only set to make the data of every seed unique
+_COUNTER = 0xfb
+
+_HEADER = struct.Struct('>4sHHHHHHHI32s32s32sHBBBB')
+
+
+def _lda_imm(value):
+    return bytes([0xa9, value])
+
+
+def _sta(addr):
+    return bytes([0x8d]) + struct.pack('<H', addr)
+
+
+def _code(sids, seed):
+    bases = SID_BASES[:sids]
+
+    init = bytearray()
+    for base in bases:
+        for voice, waveform in enumerate(_WAVEFORMS):
+            reg = base + 7 * voice
+            init += _lda_imm(0x08) + _sta(reg + 3)      # pulse width
+            init += _lda_imm(0x09) + _sta(reg + 5)      # attack/decay
+            init += _lda_imm(0xf0) + _sta(reg + 6)      # sustain/release
+            init += _lda_imm(waveform) + _sta(reg + 4)  # waveform + gate
+        init += _lda_imm(0x0f) + _sta(base + 0x18)      # volume
+    init += _lda_imm(seed & 0xff) + bytes([0x85, _COUNTER])
+    init += _lda_imm((seed >> 8) & 0xff) + bytes([0x85, _COUNTER + 1])
+    init += b'\x60'
+
+    play = bytearray(bytes([0xe6, _COUNTER]))           # inc counter
+    for base in bases:
+        play += bytes([0xa5, _COUNTER]) + _sta(base + 1)
+        play += b'\x0a' + _sta(base + 8)                # asl a
+        play += b'\x0a' + _sta(base + 15)
+    play += b'\x60'
+
+    return bytes(init), bytes(play)
+
+
+def psid(sids=1, songs=1, seed=0, name=None):
+    """
+    Return a PSID v4 tune using ``sids`` sid chips (1-3) with ``songs``
+    subtunes. ``seed`` changes the start value of the frame counter, so
+    tunes with different seeds have different MD5s.
+    """
+    if not 1 <= sids <= len(SID_BASES):
+        raise ValueError('sids must be between 1 and {}'.format(
+            len(SID_BASES)))
+    if name is None:
+        name = 'Synthetic {}SID #{}'.format(sids, seed)
+
+    init, play = _code(sids, seed)
+    extra = [(base >> 4) & 0xff for base in SID_BASES[1:sids]]
+    second, third = extra + [0] * (2 - len(extra))
+
+    header = _HEADER.pack(
+        b'PSID', 4, _HEADER.size, 0, LOAD_ADDR, LOAD_ADDR + len(init),
+        songs, 1, 0, name.encode('latin-1'), b'libsidplayfp-python',
+        b'benchmarks',
+        0x14,  # PAL, MOS6581
+        0, 0, second, third)
+    return header + struct.pack('<H', LOAD_ADDR) + init + play
+
+
+def write_tunes(directory, count, sids=1, songs=1):
+    """Write ``count`` tunes into ``directory`` and return their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for seed in range(count):
+        path = os.path.join(
+            directory, 'synth_{}sid_{:04d}.sid'.format(sids, seed))
+        with open(path, 'wb') as f:
+            f.write(psid(sids, songs, seed))
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('directory')
+    parser.add_argument('-n', '--count', type=int, default=10)
+    parser.add_argument('--sids', type=int, default=1)
+    parser.add_argument('--songs', type=int, default=1)
+    args = parser.parse_args()
+
+    for path in write_tunes(args.directory, args.count, args.sids,
+                            args.songs):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -16,12 +16,42 @@
 
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+# The compiled extension module links libsidplayfp and creating the enums
+# needs its constants, so libsidplayfp.libsidplayfp is only imported when
+# one of its names is used first. Importing the package (or utilities like
+# libsidplayfp.songlength) for metadata only does not load the emulator.
+import importlib
 
-from libsidplayfp.libsidplayfp import (
-    SidPlayfp, SidConfig, SidInfo,
+from libsidplayfp.errors import (
     SidError, SidPlayfpConfigError, SidPlayfpLoadError, SidTuneError,
-    C64Model, Playback, SamplingMethod, SidModel,
-    SidTune, SidTuneInfo, SidClock, SidCompatibility,
-    SidBuilder, ReSIDfpBuilder, ReSIDBuilder, HardSIDBuilder,
-    SidDatabase, SidDatabaseError,
-    ffi, lib)
+    SidDatabaseError)
+
+
+_LAZY_NAMES = (
+    'SidPlayfp', 'SidConfig', 'SidInfo',
+    'C64Model', 'Playback', 'SamplingMethod', 'SidModel',
+    'SidTune', 'SidTuneInfo', 'SidTuneInfoSnapshot', 'SidClock',
+    'SidCompatibility',
+    'SidBuilder', 'ReSIDfpBuilder', 'ReSIDBuilder', 'HardSIDBuilder',
+    'SidDatabase', 'SidTrace',
+    'ffi', 'lib')
+
+__all__ = [
+    'SidError', 'SidPlayfpConfigError', 'SidPlayfpLoadError',
+    'SidTuneError', 'SidDatabaseError'] + list(_LAZY_NAMES)
+
+
+def __getattr__(name):
+    if name not in _LAZY_NAMES:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name))
+
+    module = importlib.import_module('libsidplayfp.libsidplayfp')
+    # cache all names, so __getattr__ is not called for them again
+    for lazy_name in _LAZY_NAMES:
+        globals()[lazy_name] = getattr(module, lazy_name)
+    return globals()[name]
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_NAMES))
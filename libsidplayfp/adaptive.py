@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import time
+from collections import namedtuple
+
+from libsidplayfp.libsidplayfp import SamplingMethod
+from libsidplayfp.batch import create_builder
+from libsidplayfp.stats import PlayerStats
+
+
+QualityLevel = namedtuple('QualityLevel', [
+    'emulation', 'sampling_method', 'fast_sampling', 'frequency'])
+QualityLevel.__doc__ = """\
+Settings of the engine used by a :py:class:`QualityController` on one
+level. ``emulation`` is ``'residfp'`` or ``'resid'``; a ``frequency`` of
+``None`` keeps the frequency the player had when the controller was created.
+"""
+
+# from the highest quality to the lowest cost
+DEFAULT_LEVELS = (
+    QualityLevel('residfp', SamplingMethod.RESAMPLE_INTERPOLATE, False, None),
+    QualityLevel('residfp', SamplingMethod.RESAMPLE_INTERPOLATE, True, None),
+    QualityLevel('residfp', SamplingMethod.INTERPOLATE, True, None),
+    QualityLevel('residfp', SamplingMethod.INTERPOLATE, True, 22050),
+    QualityLevel('resid', SamplingMethod.INTERPOLATE, True, 22050),
+)
+
+QualitySwitch = namedtuple('QualitySwitch', [
+    'old_level', 'new_level', 'settings', 'realtime_factor', 'position'])
+QualitySwitch.__doc__ = """\
+Event passed to the ``on_switch`` callback of a :py:class:`QualityController`
+after the engine was reconfigured. ``settings`` is the new
+:py:class:`QualityLevel`, ``realtime_factor`` the measurement which caused
+the switch and ``position`` the playing time in seconds at which playback
+continues.
+"""
+
+
+class QualityController:
+    """
+    Switch the settings of a :py:class:`SidPlayfp` between quality
+    ``levels`` depending on the measured realtime factor (seconds of audio
+    produced per second of wall time).
+
+    The realtime factor is measured over ``window`` seconds of produced
+    audio. If it falls below ``degrade_below``, the next cheaper level is
+    selected; if it rises above ``upgrade_above``, the next better one. After
+    a switch, no other switch is selected for ``cooldown`` seconds (wall
+    time).
+
+    Reconfiguring restarts the loaded tune, so a selected switch is only
+    applied at a safe boundary: when :py:func:`load` is called. If
+    ``immediate`` is true, it is applied right after the measurement
+    instead and playback continues at the previous position using
+    :py:func:`SidPlayfp.seek`, which costs some emulation time.
+
+    ``on_switch`` is called with a :py:class:`QualitySwitch` for every
+    applied switch. ``sids`` is the number of sid emulations created for a
+    new builder.
+    """
+
+    def __init__(self, player, levels=DEFAULT_LEVELS, level=0,
+                 degrade_below=1.2, upgrade_above=3.0, window=2.0,
+                 cooldown=10.0, immediate=False, on_switch=None, sids=3,
+                 hook=None):
+        if not levels:
+            raise ValueError('at least one level is required')
+        if degrade_below >= upgrade_above:
+            raise ValueError('degrade_below must be lower than upgrade_above')
+
+        self.player = player
+        self.levels = tuple(levels)
+        self.degrade_below = degrade_below
+        self.upgrade_above = upgrade_above
+        self.window = window
+        self.cooldown = cooldown
+        self.immediate = immediate
+        self.on_switch = on_switch
+        self.sids = sids
+        self.hook = hook
+
+        self.level = None
+        self.pending = level
+        self.realtime_factor = None
+        self._frequency = player.config.frequency
+        self._last_switch = None
+        self._old_builder = None
+        self._audio = 0.0
+        self._wall = 0.0
+
+        self.stats = PlayerStats(player, hook=self._hook)
+
+    def attach(self):
+        """
+        Measure every call of the player producing samples (see
+        :py:class:`~libsidplayfp.stats.PlayerStats`).
+        """
+        self.stats.attach()
+
+    def detach(self):
+        """Stop measuring the calls of the player."""
+        self.stats.detach()
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.detach()
+
+    def _hook(self, event, wall, cpu, samples):
+        if event == 'play':
+            config = self.player.config
+            self.observe(
+                samples / (config.frequency * config.playback.value), wall)
+        if self.hook is not None:
+            self.hook(event, wall, cpu, samples)
+
+    def observe(self, audio_seconds, wall):
+        """
+        Add a measurement: ``audio_seconds`` of audio were produced in
+        ``wall`` seconds. Call this directly if the player is not driven by
+        the instrumented methods (e.g. when using
+        :py:func:`SidPlayfp.stream`).
+        """
+        self._audio += audio_seconds
+        self._wall += wall
+        if self._audio < self.window:
+            return
+
+        factor = self.realtime_factor = (
+            self._audio / self._wall if self._wall else float('inf'))
+        self._audio = self._wall = 0.0
+
+        current = self.level if self.level is not None else 0
+        if self.pending is None and self._cooled_down():
+            if (factor < self.degrade_below
+                    and current + 1 < len(self.levels)):
+                self.pending = current + 1
+            elif factor > self.upgrade_above and current > 0:
+                self.pending = current - 1
+
+        if (self.immediate and self.pending is not None
+                and self.player._current_tune is not None):
+            self.apply(keep_position=True)
+
+    def _cooled_down(self):
+        if self._last_switch is None:
+            return True
+        return time.monotonic() - self._last_switch >= self.cooldown
+
+    def apply(self, keep_position=False):
+        """
+        Reconfigure the player for the selected level now. If
+        ``keep_position`` is true, playback of the loaded tune continues at
+        the current position, otherwise it restarts. Returns whether the
+        settings were changed.
+        """
+        if self.pending is None:
+            return False
+        new, self.pending = self.pending, None
+        old = self.level
+        if new == old:
+            return False
+
+        player = self.player
+        position = None
+        if keep_position and player._current_tune is not None:
+            position = player.time_ms / 1000
+
+        settings = self.levels[new]
+        self._configure(settings, old)
+        self.level = new
+        self._last_switch = time.monotonic()
+        self._audio = self._wall = 0.0
+
+        if position is not None:
+            player.seek(position)
+        if self.on_switch is not None:
+            self.on_switch(QualitySwitch(
+                old, new, settings, self.realtime_factor, position or 0))
+        return True
+
+    def _configure(self, settings, old):
+        player = self.player
+        config = player.config
+
+        if old is None or self.levels[old].emulation != settings.emulation:
+            # the engine releases the sids of the old builder only in
+            # configure(), so the builder must live until then
+            self._old_builder = config.sid_emulation
+            config.sid_emulation = create_builder(
+                settings.emulation, self.sids)
+
+        config.sampling_method = settings.sampling_method
+        config.fast_sampling = settings.fast_sampling
+        if settings.frequency is None:
+            config.frequency = self._frequency
+        else:
+            config.frequency = settings.frequency
+        player.configure()
+        self._old_builder = None
+
+    def load(self, tune, song=None):
+        """
+        Apply a selected switch and start playing ``song`` of ``tune``
+        using :py:func:`SidPlayfp.reset`.
+        """
+        self.apply()
+        return self.player.reset(tune, song)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+
+# marks the end of the stream in the queue
+_END = object()
+
+
+class _Failure:
+    """Internally used to pass an exception through the queue."""
+
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class AsyncSidPlayer:
+    """
+    Render chunks of a :py:class:`SidPlayfp` in an executor and iterate over
+    them with ``async for``.
+
+    Up to ``readahead`` chunks are rendered in advance. If the consumer is
+    slower, rendering pauses until it catches up. Chunks are reused like in
+    :py:func:`SidPlayfp.stream`: a chunk stays valid until the next chunk is
+    requested.
+
+    While iterating, ``player`` must not be used by any other code. If no
+    ``executor`` is given, a dedicated single-threaded executor is created
+    and shut down by :py:func:`aclose`.
+    """
+
+    def __init__(self, player, chunk_samples, duration=None, out_dtype=None,
+                 readahead=4, executor=None):
+        if readahead < 1:
+            raise ValueError('readahead must be at least 1')
+
+        self.player = player
+        self.chunk_samples = chunk_samples
+        self.duration = duration
+        self.out_dtype = out_dtype
+        self.readahead = readahead
+
+        if executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='sidplayfp')
+            self._own_executor = True
+        else:
+            self._executor = executor
+            self._own_executor = False
+
+        self._stream = None
+        self._queue = None
+        self._task = None
+        # future of the call to next() submitted to the executor
+        self._pending = None
+        self._finished = False
+        self._closed = False
+
+    def _start(self):
+        # one buffer for each queued chunk, the chunk held by the consumer
+        # and the chunk waiting to be queued
+        self._stream = self.player.stream(
+            self.chunk_samples, self.duration, self.out_dtype,
+            buffers=self.readahead + 2)
+        self._queue = asyncio.Queue(self.readahead)
+        self._task = asyncio.get_running_loop().create_task(self._produce())
+
+    async def _produce(self):
+        try:
+            while True:
+                self._pending = self._executor.submit(
+                    next, self._stream, _END)
+                chunk = await asyncio.wrap_future(self._pending)
+                await self._queue.put(chunk)
+                if chunk is _END:
+                    break
+        except Exception as e:
+            await self._queue.put(_Failure(e))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self._closed or self._finished:
+            raise StopAsyncIteration
+        if self._task is None:
+            self._start()
+
+        item = await self._queue.get()
+        if item is _END:
+            self._finished = True
+            raise StopAsyncIteration
+        if isinstance(item, _Failure):
+            self._finished = True
+            raise item.exc
+        return item
+
+    async def aclose(self):
+        """
+        Stop rendering and release the executor if it was created by this
+        instance. Any chunk rendered in the executor is finished first.
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        loop = asyncio.get_running_loop()
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            # a call to next() which already runs cannot be cancelled; the
+            # generator may only be closed after it has finished
+            if self._pending is not None:
+                await asyncio.wait([asyncio.wrap_future(self._pending)])
+            self._stream.close()
+
+        if self._own_executor:
+            await loop.run_in_executor(
+                None, self._executor.shutdown, True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Store a collection of sidtunes in a single indexed file.
+
+Usage: python3 -m libsidplayfp.archive build ARCHIVE DIRECTORY [PATTERN]
+       python3 -m libsidplayfp.archive list ARCHIVE
+"""
+import mmap
+import os
+import struct
+import sys
+
+from libsidplayfp.files import find_tunes
+
+
+MAGIC = b'SIDPACK1'
+
+# magic, number of tunes, offset of the index
+_HEADER = struct.Struct('<8sIQ')
+# offset and size of the data of a tune, length of its name
+_ENTRY = struct.Struct('<QIH')
+
+
+def _name(name):
+    return name.replace(os.sep, '/').lstrip('/')
+
+
+def build_archive(filename, root, pattern='*.sid'):
+    """
+    Store all files below ``root`` matching ``pattern`` in the archive
+    ``filename``. Tunes are named by their path relative to ``root`` using
+    ``/`` as separator. Returns the number of stored tunes.
+    """
+    entries = []
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, 0, 0))
+        for path in find_tunes(root, pattern):
+            with open(path, 'rb') as tune_file:
+                data = tune_file.read()
+            name = _name(os.path.relpath(path, root)).encode('utf-8')
+            entries.append((f.tell(), len(data), name))
+            f.write(data)
+
+        index_offset = f.tell()
+        for offset, size, name in entries:
+            f.write(_ENTRY.pack(offset, size, len(name)))
+            f.write(name)
+
+        f.seek(0)
+        f.write(_HEADER.pack(MAGIC, len(entries), index_offset))
+    return len(entries)
+
+
+class TuneArchive:
+    """
+    Read sidtunes from an archive created by :py:func:`build_archive`.
+
+    The archive is memory-mapped and only its index is read when opening
+    it. Tunes are passed to libsidplayfp directly from the mapping, so
+    loading a tune needs neither a system call nor a copy in Python.
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        try:
+            self._entries = self._read_index()
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError('invalid tune archive') from None
+
+    def _read_index(self):
+        magic, count, offset = _HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            raise ValueError
+
+        entries = {}
+        for _ in range(count):
+            data_offset, size, length = _ENTRY.unpack_from(
+                self._view, offset)
+            offset += _ENTRY.size
+            name = bytes(self._view[offset:offset + length]).decode('utf-8')
+            offset += length
+            if data_offset + size > len(self._view):
+                raise ValueError
+            entries[name] = (data_offset, size)
+        return entries
+
+    def close(self):
+        """
+        Close the archive. All views returned by :py:func:`data` have to
+        be released before.
+        """
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return _name(name) in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def names(self):
+        """Return the names of all stored tunes."""
+        return list(self._entries)
+
+    def data(self, name):
+        """
+        Return the content of the tune ``name`` as read-only memoryview of
+        the mapped archive.
+
+        :raises KeyError: if there is no tune named ``name``
+        """
+        offset, size = self._entries[_name(name)]
+        return self._view[offset:offset + size]
+
+    def tune(self, name, cache=None):
+        """
+        Load the tune ``name``.
+
+        :raises KeyError: if there is no tune named ``name``
+        :raises SidTuneError: if loading the tune fails
+        """
+        from libsidplayfp.libsidplayfp import SidTune
+
+        with self.data(name) as data:
+            return SidTune(source_buffer=data, cache=cache)
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) in (3, 4) and args[0] == 'build':
+        count = build_archive(*args[1:])
+        print('stored {} tunes in {}'.format(count, args[1]))
+    elif len(args) == 2 and args[0] == 'list':
+        with TuneArchive(args[1]) as archive:
+            for name in archive:
+                print(name)
+    else:
+        sys.exit(__doc__.strip())
+
+
+if __name__ == '__main__':
+    main()
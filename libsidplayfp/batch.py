@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import multiprocessing
+import os
+import threading
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from libsidplayfp.libsidplayfp import (
+    SidPlayfp, SidTune, SidError, ReSIDfpBuilder, ReSIDBuilder,
+    Playback, SamplingMethod)
+
+
+BatchResult = namedtuple(
+    'BatchResult', ['path', 'song', 'result', 'time', 'error'])
+BatchResult.__doc__ = """\
+Result of rendering a single subtune with :py:func:`render_batch`,
+:py:func:`render_threaded` or :py:func:`render_subtunes`.
+
+``result`` is the rendered audio (or the return value of the handler) and
+``error`` is ``None`` on success. If loading the tune failed, ``result`` and
+``time`` are ``None`` and ``error`` holds the raised :py:class:`SidError`.
+"""
+
+
+_BUILDERS = {
+    'residfp': ReSIDfpBuilder,
+    'resid': ReSIDBuilder,
+}
+
+# serializes creating engines and builders, as initialization of emulation
+# tables is not guaranteed to be thread-safe by libsidplayfp; reentrant as
+# create_player() calls create_builder()
+_create_lock = threading.RLock()
+
+
+def create_builder(emulation='residfp', sids=3):
+    """
+    Create a sid builder for ``emulation`` (``'residfp'`` or ``'resid'``)
+    with ``sids`` sid emulations. Builders are created one after another,
+    so this may be called from several threads at once.
+    """
+    with _create_lock:
+        builder = _BUILDERS[emulation](emulation)
+        builder.create(sids)
+    return builder
+
+
+def create_player(emulation='residfp', sids=3, frequency=44100,
+                  playback=Playback.MONO,
+                  sampling_method=SamplingMethod.INTERPOLATE,
+                  fast_sampling=False, kernal=None, basic=None,
+                  character=None):
+    """
+    Create a :py:class:`SidPlayfp` together with a sid builder and configure
+    it. The builder is owned by the player's :py:class:`SidConfig`, so it
+    lives as long as the player.
+
+    ``emulation`` is either ``'residfp'`` or ``'resid'``. All arguments are
+    plain picklable values, so they can be passed to worker processes.
+    Engines are created one after another, so this may be called from
+    several threads at once.
+    """
+    with _create_lock:
+        player = SidPlayfp()
+        if (kernal is not None or basic is not None
+                or character is not None):
+            player.set_roms(kernal, basic, character)
+
+        config = player.config
+        config.sid_emulation = create_builder(emulation, sids)
+        config.frequency = frequency
+        config.playback = playback
+        config.sampling_method = sampling_method
+        config.fast_sampling = fast_sampling
+        player.configure()
+
+    return player
+
+
+class _Worker:
+    """
+    Internally used to render tunes using a single engine which is created
+    once and reused for every tune.
+    """
+
+    def __init__(self, seconds, handler, player_options):
+        self.player = create_player(**player_options)
+        self.handler = handler
+
+        config = self.player.config
+        samples = int(seconds * config.frequency) * config.playback.value
+        self.buffer = array('h', bytes(2 * samples))
+
+    def render(self, job):
+        path, song = job
+        try:
+            tune = SidTune(os.fsencode(path))
+        except SidError as e:
+            return BatchResult(path, song, None, None, e)
+        return self.render_tune(tune, path, song)
+
+    def render_tune(self, tune, path, song, load_lock=None):
+        try:
+            if load_lock is None:
+                self.player.reset(tune, song)
+            else:
+                with load_lock:
+                    self.player.reset(tune, song)
+            _, count, time = self.player.render(out=self.buffer)
+        except SidError as e:
+            return BatchResult(path, song, None, None, e)
+
+        samples = memoryview(self.buffer)[:count]
+        if self.handler is None:
+            result = samples.tobytes()
+        else:
+            result = self.handler(samples)
+        return BatchResult(path, song, result, time, None)
+
+
+# engine of a worker process, created by _init_worker()
+_worker = None
+
+
+def _init_worker(seconds, handler, player_options):
+    global _worker
+    _worker = _Worker(seconds, handler, player_options)
+
+
+def _render_job(job):
+    return _worker.render(job)
+
+
+def _normalize_job(job):
+    if isinstance(job, (str, bytes, os.PathLike)):
+        return job, 0
+    path, song = job
+    return path, song
+
+
+def render_batch(jobs, seconds, processes=None, chunksize=16, handler=None,
+                 progress=None, ordered=False, **player_options):
+    """
+    Render many subtunes using a pool of worker processes.
+
+    Each job is either a path to a sidtune (the start song is rendered) or a
+    tuple ``(path, song)``. Every worker process creates a single engine
+    using :py:func:`create_player` with ``player_options`` and reuses it for
+    all of its jobs. Jobs are sent to the workers in chunks of
+    ``chunksize``.
+
+    Results are yielded as :py:class:`BatchResult` as soon as they are
+    available (or in job order if ``ordered`` is true). Errors while loading
+    a tune are reported in :py:attr:`BatchResult.error` and do not stop the
+    batch.
+
+    ``handler`` is called in the worker process with a memoryview of the
+    rendered 16-bit samples and its return value is sent back as
+    :py:attr:`BatchResult.result` (by default the samples as ``bytes``). It
+    has to be picklable, e.g. a module-level function. Use it to compute
+    fingerprints or other small results in the workers instead of sending
+    all audio back.
+
+    ``progress`` is called with ``(done, total)`` after each finished job,
+    ``total`` is ``None`` if ``jobs`` has no length.
+    """
+    try:
+        total = len(jobs)
+    except TypeError:
+        total = None
+
+    jobs = map(_normalize_job, jobs)
+    initargs = (seconds, handler, player_options)
+
+    with multiprocessing.Pool(processes, _init_worker, initargs) as pool:
+        if ordered:
+            results = pool.imap(_render_job, jobs, chunksize)
+        else:
+            results = pool.imap_unordered(_render_job, jobs, chunksize)
+
+        for done, result in enumerate(results, 1):
+            if progress is not None:
+                progress(done, total)
+            yield result
+
+
+def _thread_workers(seconds, handler, player_options):
+    """
+    Return a function returning the :py:class:`_Worker` of the calling
+    thread, creating it on first use.
+    """
+    local = threading.local()
+
+    def get_worker():
+        worker = getattr(local, 'worker', None)
+        if worker is None:
+            worker = local.worker = _Worker(seconds, handler, player_options)
+        return worker
+
+    return get_worker
+
+
+def render_threaded(jobs, seconds, threads=None, handler=None,
+                    progress=None, **player_options):
+    """
+    Render many subtunes using a pool of threads.
+
+    This works like :py:func:`render_batch` but uses threads instead of
+    processes, avoiding the cost of starting processes and pickling results.
+    As cffi releases the GIL while the emulation runs, threads render in
+    parallel. Each thread owns a single engine which is never shared with
+    other threads. ``handler`` does not need to be picklable but should
+    release the GIL as well (e.g. hashing or numpy) to scale.
+
+    Results are yielded in job order. At most a few jobs per thread are
+    queued at once, so ``jobs`` may be a long lazy iterable.
+    """
+    try:
+        total = len(jobs)
+    except TypeError:
+        total = None
+
+    if threads is None:
+        threads = os.cpu_count() or 1
+    get_worker = _thread_workers(seconds, handler, player_options)
+
+    def render(job):
+        return get_worker().render(job)
+
+    with ThreadPoolExecutor(threads) as executor:
+        pending = deque()
+        done = 0
+        for job in map(_normalize_job, jobs):
+            pending.append(executor.submit(render, job))
+            if len(pending) < 4 * threads:
+                continue
+
+            done += 1
+            result = pending.popleft().result()
+            if progress is not None:
+                progress(done, total)
+            yield result
+
+        while pending:
+            done += 1
+            result = pending.popleft().result()
+            if progress is not None:
+                progress(done, total)
+            yield result
+
+
+def render_subtunes(tune, seconds, songs=None, threads=None, handler=None,
+                    **player_options):
+    """
+    Render all subtunes (or the song numbers in ``songs``) of a single tune
+    using a pool of threads, each owning a single engine.
+
+    ``tune`` is either a :py:class:`SidTune` or a path to a sidtune, which
+    is read once. All engines load the same :py:class:`SidTune`; only
+    selecting the song and loading it into an engine are serialized, the
+    subtunes are rendered in parallel. Afterwards the tune has the last
+    rendered subtune selected.
+
+    Returns a list of :py:class:`BatchResult` in the order of ``songs``.
+    ``BatchResult.path`` is the path of the tune or ``None`` if a
+    :py:class:`SidTune` was passed.
+
+    :raises SidTuneError: if ``tune`` is a path and loading it fails
+    """
+    path = None
+    if not isinstance(tune, SidTune):
+        path = tune
+        tune = SidTune(os.fsencode(path))
+
+    if songs is None:
+        songs = range(1, tune.get_info().songs + 1)
+    songs = list(songs)
+    if not songs:
+        return []
+
+    if threads is None:
+        threads = os.cpu_count() or 1
+    threads = min(threads, len(songs))
+    get_worker = _thread_workers(seconds, handler, player_options)
+    load_lock = threading.Lock()
+
+    def render(song):
+        return get_worker().render_tune(tune, path, song, load_lock)
+
+    with ThreadPoolExecutor(threads) as executor:
+        return list(executor.map(render, songs))
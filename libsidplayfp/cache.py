@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import json
+import os
+import sqlite3
+import threading
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tunes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime INTEGER NOT NULL,
+    record TEXT NOT NULL
+)
+'''
+
+# version of the stored records, kept in the user_version of the database;
+# a database with another version is cleared when it is opened
+SCHEMA_VERSION = 1
+
+
+def _key(path):
+    return os.path.abspath(os.fsdecode(path))
+
+
+def file_stat(path):
+    """
+    Return the size and modification time (in nanoseconds) of the file at
+    ``path``, which identify its contents in the cache, or ``None`` if it
+    does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _encode_bytes(value):
+    if value is None:
+        return None
+    return value.decode('latin-1')
+
+
+def _decode_bytes(value):
+    if value is None:
+        return None
+    return value.encode('latin-1')
+
+
+def _encode(record):
+    """Internally used to store a record as JSON object."""
+    data = record._asdict()
+    data['path'] = None if record.path is None else os.fsdecode(record.path)
+    data['md5'] = _encode_bytes(record.md5)
+    data['format_string'] = _encode_bytes(record.format_string)
+    data['info_strings'] = [_encode_bytes(s) for s in record.info_strings]
+    data['comment_strings'] = [
+        _encode_bytes(s) for s in record.comment_strings]
+    data['sid_models'] = [model.value for model in record.sid_models]
+    data['compatibility'] = record.compatibility.value
+    data['clock_speed'] = record.clock_speed.value
+    return json.dumps(data, separators=(',', ':'))
+
+
+def _decode(text):
+    """Internally used to restore a record stored by :py:func:`_encode`."""
+    # the enums are created from the constants of the compiled module
+    from libsidplayfp.libsidplayfp import (
+        SidClock, SidCompatibility, SidModel)
+    from libsidplayfp.scan import TuneRecord
+
+    data = json.loads(text)
+    data['md5'] = _decode_bytes(data['md5'])
+    data['format_string'] = _decode_bytes(data['format_string'])
+    data['info_strings'] = tuple(
+        _decode_bytes(s) for s in data['info_strings'])
+    data['comment_strings'] = tuple(
+        _decode_bytes(s) for s in data['comment_strings'])
+    data['song_speeds'] = tuple(data['song_speeds'])
+    data['sid_chip_bases'] = tuple(data['sid_chip_bases'])
+    data['sid_models'] = tuple(SidModel(m) for m in data['sid_models'])
+    data['compatibility'] = SidCompatibility(data['compatibility'])
+    data['clock_speed'] = SidClock(data['clock_speed'])
+    return TuneRecord(**data)
+
+
+class MetadataCache:
+    """
+    Persistent cache of :py:class:`~libsidplayfp.scan.TuneRecord` objects
+    stored in an SQLite database.
+
+    Entries are keyed by the absolute path of a tune together with its size
+    and modification time. An entry is ignored (and replaced on the next
+    update) as soon as the file changes.
+
+    Records are stored as JSON. A database written with another
+    :py:data:`SCHEMA_VERSION` is cleared when it is opened.
+    """
+
+    def __init__(self, filename=':memory:'):
+        self._db = sqlite3.connect(os.fspath(filename),
+                                   check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            version = self._db.execute('PRAGMA user_version').fetchone()[0]
+            if version != SCHEMA_VERSION:
+                self._db.execute('DROP TABLE IF EXISTS tunes')
+                self._db.execute(
+                    'PRAGMA user_version = {:d}'.format(SCHEMA_VERSION))
+            self._db.execute(_SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get(self, path, stat=None):
+        """
+        Return the cached record of the tune at ``path`` or ``None`` if it is
+        not cached or the file has changed. If ``stat`` (as returned by
+        :py:func:`file_stat`) is given, ``None`` is also returned if the file
+        changed since then.
+        """
+        key = _key(path)
+        current = file_stat(key)
+        if current is None or (stat is not None and current != stat):
+            return None
+
+        with self._lock:
+            row = self._db.execute(
+                'SELECT size, mtime, record FROM tunes WHERE path = ?',
+                (key,)).fetchone()
+        if row is None:
+            return None
+        if (row[0], row[1]) != current:
+            return None
+        try:
+            return _decode(row[2])
+        except (ValueError, TypeError, KeyError):
+            # a damaged entry is replaced on the next update
+            return None
+
+    def put(self, path, record, stat=None):
+        """
+        Store ``record`` for the tune at ``path``. ``stat`` is the result of
+        :py:func:`file_stat` when the tune was read; nothing is stored if the
+        file changed since then, as ``record`` describes the old contents.
+        """
+        key = _key(path)
+        current = file_stat(key)
+        if stat is not None and current != stat:
+            return
+        if current is None:
+            raise FileNotFoundError(key)
+        data = _encode(record)
+        with self._lock, self._db:
+            self._db.execute(
+                'INSERT OR REPLACE INTO tunes VALUES (?, ?, ?, ?)',
+                (key, current[0], current[1], data))
+
+    def invalidate(self, path):
+        """Remove the entry of the tune at ``path``."""
+        with self._lock, self._db:
+            self._db.execute(
+                'DELETE FROM tunes WHERE path = ?', (_key(path),))
+
+    def prune(self):
+        """
+        Remove all entries of files which have been changed or deleted.
+        Returns the number of removed entries.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT path, size, mtime FROM tunes').fetchall()
+
+        stale = []
+        for path, size, mtime in rows:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stale.append((path,))
+                continue
+            if stat.st_size != size or stat.st_mtime_ns != mtime:
+                stale.append((path,))
+
+        with self._lock, self._db:
+            self._db.executemany('DELETE FROM tunes WHERE path = ?', stale)
+        return len(stale)
+
+    def tune_record(self, tune, path, stat=None):
+        """
+        Return the record of ``tune`` loaded from ``path`` when the file had
+        the given ``stat`` (see :py:func:`file_stat`). If it is not cached
+        yet, it is read from ``tune`` and stored unless the file has changed
+        since it was loaded.
+        """
+        record = self.get(path, stat)
+        if record is None:
+            from libsidplayfp.scan import scan_tune
+
+            record = scan_tune(tune, os.fsdecode(path))
+            self.put(path, record, stat)
+        return record
+
+    def record(self, path):
+        """
+        Return the record of the tune at ``path``. The tune is only loaded
+        if it is not cached yet.
+
+        :raises SidTuneError: if loading the tune fails
+        """
+        stat = file_stat(_key(path))
+        record = self.get(path, stat)
+        if record is None:
+            from libsidplayfp.scan import scan_file
+
+            record = scan_file(os.fsdecode(path))
+            self.put(path, record, stat)
+        return record
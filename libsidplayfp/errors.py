@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Exceptions raised by the wrapper. They are defined separately, so modules
+which do not need the emulation can raise them without loading the compiled
+extension module.
+"""
+
+
+class SidError(Exception):
+    pass
+
+
+class SidPlayfpConfigError(SidError):
+    """Error raised while setting :py:attr:`SidPlayfp.config`."""
+    pass
+
+
+class SidPlayfpLoadError(SidError):
+    """Error raised by :py:func:`SidPlayfp.load` while loading a tune."""
+    pass
+
+
+class SidTuneError(SidError):
+    """Error raised when loading or reading a :py:class:`SidTune` fails."""
+    pass
+
+
+class SidDatabaseError(SidError):
+    """Exception raised by :py:class:`SidDatabase`"""
+    pass
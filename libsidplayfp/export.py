@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+import wave
+from array import array
+
+from libsidplayfp.libsidplayfp import SidDatabaseError, ffi, lib
+from libsidplayfp.batch import create_player
+
+
+FORMATS = ('wav', 'raw', 'flac')
+
+_EXTENSIONS = {
+    '.wav': 'wav',
+    '.raw': 'raw',
+    '.pcm': 'raw',
+    '.flac': 'flac',
+}
+
+
+class _RawWriter:
+    """Writes signed 16-bit little endian samples without a header."""
+
+    def __init__(self, path, frequency, channels):
+        self.file = open(path, 'wb')
+
+    def write(self, samples):
+        if sys.byteorder != 'little':
+            samples = array('h', samples)
+            samples.byteswap()
+        self.file.write(samples)
+
+    def close(self):
+        self.file.close()
+
+
+class _WavWriter:
+    """Writes a 16-bit PCM WAV file."""
+
+    def __init__(self, path, frequency, channels):
+        self.file = wave.open(os.fspath(path), 'wb')
+        self.file.setnchannels(channels)
+        self.file.setsampwidth(2)
+        self.file.setframerate(frequency)
+
+    def write(self, samples):
+        self.file.writeframesraw(samples)
+
+    def close(self):
+        self.file.close()
+
+
+class _FlacWriter:
+    """Writes a FLAC file using the optional soundfile package."""
+
+    def __init__(self, path, frequency, channels):
+        try:
+            import soundfile
+        except ImportError:
+            raise ImportError(
+                'writing FLAC files requires the soundfile package') from None
+        import numpy
+
+        self.numpy = numpy
+        self.channels = channels
+        self.file = soundfile.SoundFile(
+            os.fspath(path), 'w', samplerate=frequency, channels=channels,
+            subtype='PCM_16', format='FLAC')
+
+    def write(self, samples):
+        frames = self.numpy.frombuffer(samples, self.numpy.int16)
+        self.file.write(frames.reshape(-1, self.channels))
+
+    def close(self):
+        self.file.close()
+
+
+_WRITERS = {
+    'wav': _WavWriter,
+    'raw': _RawWriter,
+    'flac': _FlacWriter,
+}
+
+
+def _duration(player, tune, database):
+    if database is None:
+        database = player.database
+    if database is None:
+        raise ValueError('duration unknown: no songlength database given')
+
+    try:
+        length_ms = getattr(database, 'length_ms', None)
+        if length_ms is not None:
+            return length_ms(tune) / 1000
+        return database.length(tune)
+    except SidDatabaseError as e:
+        raise ValueError('duration unknown: {}'.format(e)) from e
+
+
+def render_to_file(tune, song, path, format=None, duration=None,
+                   fade_out=0, database=None, player=None,
+                   chunk_seconds=1, **player_options):
+    """
+    Render ``song`` of ``tune`` into the file ``path``.
+
+    ``format`` is one of ``'wav'``, ``'raw'`` (signed 16-bit little endian)
+    or ``'flac'`` (requires the soundfile package). By default it is taken
+    from the extension of ``path`` (WAV if unknown).
+
+    If ``duration`` is not given, the length of the song is looked up in
+    ``database`` (by default :py:attr:`SidPlayfp.database` of the player).
+    The last ``fade_out`` seconds of the rendered audio are faded out
+    linearly, also if rendering stops early.
+
+    ``player`` is used for rendering, otherwise one is created using
+    :py:func:`~libsidplayfp.batch.create_player` with ``player_options``.
+    Audio is rendered into a single buffer of ``chunk_seconds`` (plus
+    ``fade_out`` seconds held back for the fade) which is reused for every
+    chunk, so memory usage does not depend on the duration.
+
+    Returns the number of written sample frames.
+
+    :raises ValueError: if the duration is unknown or the format is invalid
+    """
+    if format is None:
+        extension = os.path.splitext(os.fspath(path))[1].lower()
+        format = _EXTENSIONS.get(extension, 'wav')
+    if format not in _WRITERS:
+        raise ValueError('format must be one of {}'.format(
+            ', '.join(FORMATS)))
+
+    if player is None:
+        player = create_player(**player_options)
+    player.reset(tune, song)
+
+    if duration is None:
+        duration = _duration(player, tune, database)
+
+    config = player.config
+    frequency = config.frequency
+    channels = config.playback.value
+
+    total = int(duration * frequency)
+    fade_frames = min(int(fade_out * frequency), total)
+    chunk_frames = max(int(chunk_seconds * frequency), 1)
+
+    # the last fade_frames frames are held back at the start of the buffer
+    # until the end of the audio is known, so the fade also ends with the
+    # audio if rendering stops early
+    buffer = array('h', bytes(2 * (fade_frames + chunk_frames) * channels))
+    buf = ffi.cast('short*', ffi.from_buffer(buffer))
+    view = memoryview(buffer)
+
+    writer = _WRITERS[format](path, frequency, channels)
+    rendered = held = 0
+    try:
+        while rendered < total:
+            frames = min(chunk_frames, total - rendered)
+            count = lib.sidplayfp_render(
+                player.obj, buf + held * channels, frames * channels,
+                0) // channels
+            rendered += count
+
+            available = held + count
+            ready = max(available - fade_frames, 0)
+            if ready:
+                writer.write(view[:ready * channels])
+            held = available - ready
+            if ready and held:
+                ffi.memmove(buf, buf + ready * channels, 2 * held * channels)
+
+            if count < frames:
+                break
+
+        if held:
+            lib.sidplayfp_fadeOut(buf, held, channels, held, fade_frames)
+            writer.write(view[:held * channels])
+    finally:
+        writer.close()
+
+    return rendered
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Find sidtune files. This module does not load the compiled extension
+module, so it can be used by tools which only read metadata.
+"""
+import fnmatch
+import os
+
+
+def find_tunes(root, pattern='*.sid'):
+    """
+    Yield paths of all files below ``root`` whose name matches ``pattern``
+    (case-insensitive).
+    """
+    pattern = pattern.lower()
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if fnmatch.fnmatchcase(filename.lower(), pattern):
+                yield os.path.join(dirpath, filename)
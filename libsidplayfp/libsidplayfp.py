@@ -20,13 +20,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import struct
+import sys
+import time
+from array import array
+from collections import namedtuple
 from enum import Enum
 
 from libsidplayfp._libsidplayfp import ffi, lib
-
-
-class SidError(Exception):
-    pass
+from libsidplayfp.cache import file_stat
+from libsidplayfp.errors import (
+    SidError, SidPlayfpConfigError, SidPlayfpLoadError, SidTuneError,
+    SidDatabaseError)
 
 
 def _property_builder(prefix):
@@ -34,11 +39,13 @@ def _property_builder(prefix):
     Internally used method to build a method that creates read-only properties.
     """
     def generate_property(name, result_wrapper=None, **kwargs):
-        def getter(self):
-            func = getattr(lib, '{}{}'.format(prefix, name))
-            if result_wrapper is None:
+        func = getattr(lib, '{}{}'.format(prefix, name))
+
+        if result_wrapper is None:
+            def getter(self):
                 return func(self.obj)
-            else:
+        else:
+            def getter(self):
                 return result_wrapper(func(self.obj))
 
         return property(getter, **kwargs)
@@ -46,14 +53,35 @@ def _property_builder(prefix):
     return generate_property
 
 
-class SidPlayfpConfigError(SidError):
-    """Error raised while setting :py:attr:`SidPlayfp.config`."""
-    pass
+def _string_or_none(s):
+    if s == ffi.NULL:
+        return None
+    return ffi.string(s)
 
 
-class SidPlayfpLoadError(SidError):
-    """Error raised by :py:func:`SidPlayfp.load` while loading a tune."""
-    pass
+def _short_buffer(buffer):
+    """
+    Internally used to get a ``short*`` pointing to a writable ``buffer``
+    of 16-bit samples and its length in samples.
+    """
+    view = memoryview(buffer)
+    if view.itemsize != 2 or view.format.lstrip('@=') != 'h':
+        raise TypeError('buffer must contain signed 16-bit samples')
+    if view.readonly:
+        raise ValueError('buffer must be writable')
+    if not view.contiguous:
+        raise ValueError('buffer must be contiguous')
+
+    buf = ffi.cast('short*', ffi.from_buffer(buffer))
+    return buf, view.nbytes // 2
+
+
+# size of the buffer receiving the discarded output of SidPlayfp.seek()
+_SEEK_SCRATCH = 8192
+
+# highest fast forward factor and number of sids used by SidPlayfp.trace()
+_TRACE_MAX_FACTOR = 32
+_TRACE_MAX_SIDS = 3
 
 
 class SidPlayfp:
@@ -68,6 +96,17 @@ class SidPlayfp:
 
         self._config = None
 
+        # validated target of play_into() and its cdata pointer
+        self._array_cache = None
+        self._float_scratch = None
+
+        # fast forward factor restored by seek() and its scratch buffer
+        self._fast_forward = 100
+        self._seek_scratch = None
+
+        # songlength database used by stream() to limit the playing time
+        self.database = None
+
     @property
     def config(self):
         if self._config is None:
@@ -79,6 +118,8 @@ class SidPlayfp:
         self._config = config
 
     def configure(self):
+        # the number of channels may change
+        self._array_cache = None
         success = lib.sidplayfp_setConfig(self.obj, self.config.obj)
 
         if not success:
@@ -93,7 +134,10 @@ class SidPlayfp:
         return ffi.string(lib.sidplayfp_error(self.obj))
 
     def fast_forward(self, percent):
-        return lib.sidplayfp_fastForward(self.obj, percent)
+        success = lib.sidplayfp_fastForward(self.obj, percent)
+        if success:
+            self._fast_forward = percent
+        return success
 
     def load(self, tune):
         success = lib.sidplayfp_load(self.obj, tune.obj)
@@ -103,6 +147,54 @@ class SidPlayfp:
 
         self._current_tune = tune
 
+    def reset(self, tune=None, song=None):
+        # load() only reinitializes the emulated C64; the sid devices created
+        # by the builder, the ROMs and the configuration are reused
+        start = time.perf_counter()
+        if tune is None:
+            tune = self._current_tune
+            if tune is None:
+                raise ValueError('no tune loaded')
+        if song is not None:
+            tune.select_song(song)
+        self.load(tune)
+        return time.perf_counter() - start
+
+    def seek(self, seconds):
+        target = int(seconds * 1000)
+        if target < self.time_ms:
+            self.reset()
+
+        config = self.config
+        channels = config.playback.value
+        frames = (target - self.time_ms) * config.frequency // 1000
+        if frames > 0:
+            if self._seek_scratch is None:
+                self._seek_scratch = ffi.new('short[]', _SEEK_SCRATCH)
+            lib.sidplayfp_seek(
+                self.obj, self._seek_scratch, _SEEK_SCRATCH,
+                frames * channels, channels, self._fast_forward)
+        return self.time_ms / 1000
+
+    def trace(self, seconds, trace=None, resolution=32, silent=True):
+        if not lib.SidTrace_supported():
+            raise SidError(
+                'register tracing requires libsidplayfp 2.2 or newer')
+        if trace is None:
+            trace = SidTrace()
+
+        config = self.config
+        channels = config.playback.value
+        factor = min(resolution, _TRACE_MAX_FACTOR) if silent else 1
+        step = max(resolution // factor, 1)
+        scratch = ffi.new('short[]', step * channels)
+
+        trace.frequency = config.frequency
+        lib.sidplayfp_trace(
+            self.obj, trace.obj, scratch, int(seconds * config.frequency),
+            step, factor, channels, _TRACE_MAX_SIDS, self._fast_forward)
+        return trace
+
     def play(self, buffer, length=None):
         buf = ffi.from_buffer(buffer)
         buf = ffi.cast('short*', buf)
@@ -110,6 +202,154 @@ class SidPlayfp:
             length = len(buffer) // 2  # 2 byte = 1 short
         return lib.sidplayfp_play(self.obj, buf, length)
 
+    def render(self, seconds=None, samples=None, out=None, chunk_size=0):
+        if seconds is not None:
+            config = self.config
+            # whole sample frames only
+            samples = (int(seconds * config.frequency)
+                       * config.playback.value)
+
+        if out is None:
+            if samples is None:
+                raise ValueError(
+                    'either seconds, samples or out must be given')
+            out = array('h', bytes(2 * samples))
+
+        buf, length = _short_buffer(out)
+        if samples is None:
+            samples = length
+        elif samples > length:
+            raise ValueError(
+                'buffer too small: {} samples requested, room for {}'.format(
+                    samples, length))
+
+        count = lib.sidplayfp_render(self.obj, buf, samples, chunk_size)
+        return out, count, self.time
+
+    def _array_target(self, array):
+        cache = self._array_cache
+        if cache is not None and cache[0] is array:
+            return cache[1], cache[2], cache[3]
+
+        channels = self.config.playback.value
+        if array.dtype not in ('int16', 'float32'):
+            raise TypeError('array must be of dtype int16 or float32')
+        if not array.flags['C_CONTIGUOUS'] or not array.flags['WRITEABLE']:
+            raise ValueError('array must be C-contiguous and writable')
+        if array.ndim == 2:
+            if array.shape[1] != channels:
+                raise ValueError(
+                    'array must have shape (n, {})'.format(channels))
+        elif array.ndim != 1:
+            raise ValueError('array must be one- or two-dimensional')
+
+        is_float = array.dtype == 'float32'
+        ctype = 'float*' if is_float else 'short*'
+        buf = ffi.cast(ctype, ffi.from_buffer(array))
+        self._array_cache = (array, buf, array.size, is_float)
+        return buf, array.size, is_float
+
+    def play_into(self, array):
+        buf, length, is_float = self._array_target(array)
+        if not is_float:
+            return lib.sidplayfp_play(self.obj, buf, length)
+
+        scratch = self._float_scratch
+        if scratch is None or len(scratch) < length:
+            scratch = self._float_scratch = ffi.new('short[]', length)
+        return lib.sidplayfp_playFloat(self.obj, buf, scratch, length)
+
+    def play_numpy(self, frames, dtype='int16'):
+        import numpy
+
+        channels = self.config.playback.value
+        if channels == 1:
+            shape = (frames,)
+        else:
+            shape = (frames, channels)
+        array = numpy.empty(shape, dtype)
+
+        # do not replace the cached target of play_into() by a temporary
+        cache = self._array_cache
+        count = self.play_into(array)
+        self._array_cache = cache
+        return array[:count // channels]
+
+    def _stream_buffer(self, samples, channels, dtype):
+        """
+        Internally used to create a buffer for :py:func:`stream` and a
+        function to fill it.
+        """
+        if dtype is None:
+            buffer = array('h', bytes(2 * samples))
+            buf, _ = _short_buffer(buffer)
+            return memoryview(buffer), buf, False
+
+        import numpy
+
+        if channels == 1:
+            shape = (samples,)
+        else:
+            shape = (samples // channels, channels)
+        buffer = numpy.empty(shape, dtype)
+
+        is_float = buffer.dtype == 'float32'
+        if not is_float and buffer.dtype != 'int16':
+            raise TypeError('out_dtype must be None, int16 or float32')
+        ctype = 'float*' if is_float else 'short*'
+        return buffer, ffi.cast(ctype, ffi.from_buffer(buffer)), is_float
+
+    def stream(self, chunk_samples, duration=None, out_dtype=None,
+               buffers=2):
+        config = self.config
+        channels = config.playback.value
+        if chunk_samples % channels != 0:
+            raise ValueError(
+                'chunk_samples must be a multiple of {}'.format(channels))
+
+        if (duration is None and self.database is not None
+                and self._current_tune is not None):
+            try:
+                duration = self.database.length(self._current_tune)
+            except SidDatabaseError:
+                pass
+
+        if duration is None:
+            remaining = None
+        else:
+            remaining = int(duration * config.frequency) * channels
+
+        ring = [self._stream_buffer(chunk_samples, channels, out_dtype)
+                for _ in range(buffers)]
+        scratch = None
+        if any(is_float for _, _, is_float in ring):
+            scratch = ffi.new('short[]', chunk_samples)
+
+        i = 0
+        while remaining is None or remaining > 0:
+            if not self.is_playing:
+                break
+
+            buffer, buf, is_float = ring[i]
+            i = (i + 1) % buffers
+
+            length = chunk_samples
+            if remaining is not None:
+                length = min(length, remaining)
+                remaining -= length
+
+            if is_float:
+                count = lib.sidplayfp_playFloat(
+                    self.obj, buf, scratch, length)
+            else:
+                count = lib.sidplayfp_play(self.obj, buf, length)
+
+            if count == 0:
+                break
+            if buffer.ndim == 2:
+                count //= channels
+            yield buffer[:count]
+
     @property
     def is_playing(self):
         return lib.sidplayfp_isPlaying(self.obj)
@@ -127,6 +367,10 @@ class SidPlayfp:
     def time(self):
         return lib.sidplayfp_time(self.obj)
 
+    @property
+    def time_ms(self):
+        return lib.sidplayfp_timeMs(self.obj)
+
     def set_roms(self, kernal, basic=None, character=None):
         def handle_buffer(buff):
             if buff is None:
@@ -146,11 +390,6 @@ class SidPlayfp:
         return lib.sidplayfp_getCia1TimerA(self.obj)
 
 
-class SidTuneError(SidError):
-    """Error raised when loading or reading a :py:class:`SidTune` fails."""
-    pass
-
-
 class SidTune:
     """
     Load a sidtune from a file.
@@ -165,6 +404,9 @@ class SidTune:
     :type filename: bytes
     :param source_buffer: buffer of complete sidtune
     :type source_buffer: bytes
+    :param cache: metadata cache consulted by :py:func:`create_MD5` for tunes
+        loaded from a file
+    :type cache: :py:class:`libsidplayfp.cache.MetadataCache`
 
     :raises SidTuneError: if loading a given tune fails
 
@@ -183,7 +425,11 @@ class SidTune:
 
     MD5_LENGTH = lib.MD5_LENGTH
 
-    def __init__(self, filename=None, source_buffer=None):
+    def __init__(self, filename=None, source_buffer=None, cache=None):
+        self.cache = cache
+        self._filename = None
+        self._stat = None
+
         if source_buffer is not None:
             obj = lib.SidTune_new_from_buffer(
                 ffi.from_buffer(source_buffer), len(source_buffer))
@@ -194,8 +440,11 @@ class SidTune:
             filename_exts = ffi.cast('char**', 0)
             sep_is_slash = os.sep == '/'
 
+            # taken before loading, so changes while loading are noticed
+            self._stat = file_stat(filename)
             obj = lib.SidTune_new_from_filename(
                 filename, filename_exts, sep_is_slash)
+            self._filename = filename
 
         self.obj = ffi.gc(obj, lib.SidTune_destroy)
 
@@ -204,7 +453,9 @@ class SidTune:
 
     def load(self, filename):
         sep_is_slash = os.sep == '/'
+        self._stat = file_stat(filename)
         lib.SidTune_load(self.obj, filename, sep_is_slash)
+        self._filename = filename
 
         if not self.status:
             raise SidTuneError(self.status_string)
@@ -212,6 +463,8 @@ class SidTune:
     def read(self, source_buffer):
         lib.SidTune_read(
             self.obj, ffi.from_buffer(source_buffer), len(source_buffer))
+        self._filename = None
+        self._stat = None
 
         if not self.status:
             raise SidTuneError(self.status_string)
@@ -237,11 +490,22 @@ class SidTune:
         return ffi.string(lib.SidTune_statusString(self.obj))
 
     def create_MD5(self):
+        if self.cache is not None and self._filename is not None:
+            return self.cache.tune_record(
+                self, self._filename, self._stat).md5
+
         md5_str = ffi.new('char[]', self.MD5_LENGTH + 1)
         md5 = lib.SidTune_createMD5(self.obj, md5_str)
-        if md5 is None:
+        if md5 == ffi.NULL:
+            return None
+        return ffi.string(md5)
+
+    def create_MD5_new(self):
+        md5_str = ffi.new('char[]', self.MD5_LENGTH + 1)
+        md5 = lib.SidTune_createMD5New(self.obj, md5_str)
+        if md5 == ffi.NULL:
             return None
-        return bytes(ffi.buffer(md5))
+        return ffi.string(md5)
 
     @property
     def c64_data(self):
@@ -369,6 +633,73 @@ class SidTuneInfo:
             return None
         return ffi.string(s)
 
+    def snapshot(self):
+        record = ffi.new('SidTuneInfoRecord*')
+        lib.SidTuneInfo_getRecord(self.obj, record)
+
+        return SidTuneInfoSnapshot(
+            current_song=record.currentSong,
+            song_speed=record.songSpeed,
+            path=_string_or_none(record.path),
+            data_filename=_string_or_none(record.dataFileName),
+            info_filename=_string_or_none(record.infoFileName),
+            **_info_record_values(record, self))
+
+
+def _info_record_values(record, info):
+    """
+    Internally used to convert the fields of a ``SidTuneInfoRecord`` shared
+    by :py:class:`SidTuneInfoSnapshot` and
+    :py:class:`~libsidplayfp.scan.TuneRecord` into a dict. Strings which do
+    not fit into the record are read from the :py:class:`SidTuneInfo`
+    ``info``.
+    """
+    count = record.numberOfInfoStrings
+    if count <= len(record.infoString):
+        info_strings = tuple(
+            ffi.string(record.infoString[i]) for i in range(count))
+    else:
+        info_strings = tuple(info.info_strings)
+
+    if record.numberOfCommentStrings:
+        comment_strings = tuple(info.comment_strings)
+    else:
+        comment_strings = ()
+
+    sid_chips = record.sidChips
+    return dict(
+        load_addr=record.loadAddr,
+        init_addr=record.initAddr,
+        play_addr=record.playAddr,
+        songs=record.songs,
+        start_song=record.startSong,
+        sid_chips=sid_chips,
+        sid_chip_bases=tuple(record.sidChipBase[0:sid_chips]),
+        reloc_start_page=record.relocStartPage,
+        reloc_pages=record.relocPages,
+        sid_models=tuple(SidModel(m) for m in record.sidModel[0:sid_chips]),
+        compatibility=SidCompatibility(record.compatibility),
+        info_strings=info_strings,
+        comment_strings=comment_strings,
+        data_file_len=record.dataFileLen,
+        c64data_len=record.c64dataLen,
+        clock_speed=SidClock(record.clockSpeed),
+        format_string=_string_or_none(record.formatString),
+        fix_load=record.fixLoad)
+
+
+SidTuneInfoSnapshot = namedtuple('SidTuneInfoSnapshot', [
+    'load_addr', 'init_addr', 'play_addr', 'songs', 'start_song',
+    'current_song', 'sid_chips', 'sid_chip_bases', 'song_speed',
+    'reloc_start_page', 'reloc_pages', 'sid_models', 'compatibility',
+    'info_strings', 'comment_strings', 'data_file_len', 'c64data_len',
+    'clock_speed', 'format_string', 'fix_load', 'path', 'data_filename',
+    'info_filename'])
+SidTuneInfoSnapshot.__doc__ = """\
+Immutable copy of all values of a :py:class:`SidTuneInfo` as returned by
+:py:func:`SidTuneInfo.snapshot`.
+"""
+
 
 class C64Model(Enum):
     """C64 model"""
@@ -409,13 +740,14 @@ class SamplingMethod(Enum):
 
 
 def _gen_SidConfig_property(name, **kwargs):
+    get_func = getattr(lib, 'SidConfig_get_{}'.format(name))
+    set_func = getattr(lib, 'SidConfig_set_{}'.format(name))
+
     def getter(self):
-        func = getattr(lib, 'SidConfig_get_{}'.format(name))
-        return func(self.obj)
+        return get_func(self.obj)
 
     def setter(self, value):
-        func = getattr(lib, 'SidConfig_set_{}'.format(name))
-        return func(self.obj, value)
+        return set_func(self.obj, value)
 
     return property(getter, setter, **kwargs)
 
@@ -543,8 +875,9 @@ class SidInfo:
 
 
 def _SidBuilder_property(name, result_wrapper=None, **kwargs):
+    func = getattr(lib, 'sidbuilder_{}'.format(name))
+
     def getter(self):
-        func = getattr(lib, 'sidbuilder_{}'.format(name))
         obj = ffi.cast('sidbuilder*', self.obj)
         if result_wrapper is None:
             return func(obj)
@@ -673,11 +1006,6 @@ class HardSIDBuilder(SidBuilder):
         super().__init__(obj)
 
 
-class SidDatabaseError(SidError):
-    """Exception raised by :py:class:`SidDatabase`"""
-    pass
-
-
 class SidDatabase:
     """An utility class to deal with the songlength database."""
 
@@ -713,3 +1041,85 @@ class SidDatabase:
 
     def _raise_error(self):
         raise SidDatabaseError(self.error)
+
+
+class SidTrace:
+    """
+    Changes of sid registers recorded by :py:func:`SidPlayfp.trace`.
+
+    Every record consists of the emulated sample frame (at
+    :py:attr:`frequency`) at which the change was seen, the sid chip, the
+    register and its new value.
+    """
+
+    MAGIC = b'SIDTRACE'
+
+    _HEADER = struct.Struct('<8sII')
+    _RECORD = struct.Struct('<IBBBx')
+
+    def __init__(self, frequency=None):
+        obj = lib.SidTrace_new()
+        self.obj = ffi.gc(obj, lib.SidTrace_destroy)
+        self.frequency = frequency
+
+    def __len__(self):
+        return lib.SidTrace_size(self.obj)
+
+    def clear(self):
+        lib.SidTrace_clear(self.obj)
+
+    def _view(self):
+        # points into the storage of the C++ vector, which is freed with
+        # the trace and moved when records are appended
+        size = len(self) * ffi.sizeof('SidWrite')
+        return ffi.buffer(lib.SidTrace_data(self.obj), size)
+
+    @property
+    def buffer(self):
+        return bytes(self._view())
+
+    def to_numpy(self):
+        import numpy
+
+        dtype = numpy.dtype({
+            'names': ['frame', 'chip', 'reg', 'value'],
+            'formats': ['=u4', 'u1', 'u1', 'u1'],
+            'offsets': [0, 4, 5, 6],
+            'itemsize': ffi.sizeof('SidWrite')})
+        return numpy.frombuffer(self._view(), dtype).copy()
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(self._HEADER.pack(
+                self.MAGIC, self.frequency or 0, len(self)))
+            if sys.byteorder == 'little':
+                f.write(self._view())
+            else:
+                writes = ffi.cast('SidWrite*', lib.SidTrace_data(self.obj))
+                for i in range(len(self)):
+                    write = writes[i]
+                    f.write(self._RECORD.pack(
+                        write.frame, write.chip, write.reg, write.value))
+
+    @classmethod
+    def load(cls, filename):
+        with open(filename, 'rb') as f:
+            data = f.read()
+
+        if len(data) < cls._HEADER.size:
+            raise ValueError('invalid trace file')
+        magic, frequency, count = cls._HEADER.unpack_from(data)
+        records = data[cls._HEADER.size:]
+        if magic != cls.MAGIC or len(records) != count * cls._RECORD.size:
+            raise ValueError('invalid trace file')
+
+        trace = cls(frequency or None)
+        writes = ffi.new('SidWrite[]', count)
+        if sys.byteorder == 'little':
+            ffi.memmove(writes, records, len(records))
+        else:
+            for i, record in enumerate(cls._RECORD.iter_unpack(records)):
+                writes[i].frame, writes[i].chip, writes[i].reg, \
+                    writes[i].value = record
+        lib.SidTrace_append(trace.obj, writes, count)
+        return trace
@@ -27,6 +27,10 @@
 #include "sidplayfp/builders/residfp.h"
 #include "sidplayfp/builders/resid.h"
 #include "sidplayfp/SidDatabase.h"
+#include "sidplayfp/sidversion.h"
+
+#include <cstring>
+#include <vector>
 
 extern "C" {
 
@@ -102,6 +106,15 @@ uint_least32_t sidplayfp_time(sidplayfp* self)
     return self->time();
 }
 
+uint_least32_t sidplayfp_timeMs(sidplayfp* self)
+{
+#if LIBSIDPLAYFP_VERSION_MAJ >= 2
+    return self->timeMs();
+#else
+    return self->time() * 1000;
+#endif
+}
+
 void sidplayfp_setRoms(sidplayfp* self, const uint8_t* kernal,
     const uint8_t* basic=0, const uint8_t* character=0)
 {
@@ -113,6 +126,285 @@ uint_least16_t sidplayfp_getCia1TimerA(sidplayfp* self)
     return self->getCia1TimerA();
 }
 
+uint_least32_t sidplayfp_render(sidplayfp* self, short *buffer,
+    uint_least32_t count, uint_least32_t chunkSize)
+{
+    // Run the emulation until count samples have been produced. Stop
+    // early if the player stops or fails to produce a full chunk.
+    uint_least32_t produced = 0;
+    while (produced < count)
+    {
+        uint_least32_t length = count - produced;
+        if (chunkSize != 0 && length > chunkSize)
+            length = chunkSize;
+
+        const uint_least32_t played = self->play(buffer + produced, length);
+        produced += played;
+
+        if (played < length)
+            break;
+    }
+    return produced;
+}
+
+uint_least32_t sidplayfp_playFloat(sidplayfp* self, float *buffer,
+    short *scratch, uint_least32_t count)
+{
+    // Produce 16-bit samples into scratch and convert them to floats
+    // normalized to [-1, 1).
+    const uint_least32_t played = self->play(scratch, count);
+    const float scale = 1.0f / 32768.0f;
+    for (uint_least32_t i = 0; i < played; i++)
+        buffer[i] = scratch[i] * scale;
+    return played;
+}
+
+static uint_least32_t discard(sidplayfp* self, short *scratch,
+    uint_least32_t scratchSize, uint_least32_t count)
+{
+    // Like sidplayfp_render() but overwrites scratch with every chunk.
+    uint_least32_t produced = 0;
+    while (produced < count)
+    {
+        uint_least32_t length = count - produced;
+        if (length > scratchSize)
+            length = scratchSize;
+
+        const uint_least32_t played = self->play(scratch, length);
+        produced += played;
+
+        if (played < length)
+            break;
+    }
+    return produced;
+}
+
+uint_least32_t sidplayfp_seek(sidplayfp* self, short *scratch,
+    uint_least32_t scratchSize, uint_least32_t count,
+    unsigned int channels, unsigned int percent)
+{
+    // Emulate count samples as fast as possible: run at the highest
+    // fast forward factor, discarding the output into scratch, and emulate
+    // the remaining frames at normal speed. percent is the fast forward
+    // factor restored afterwards. Returns the number of emulated samples.
+    static const unsigned int MAX_FACTOR = 32;
+
+    const uint_least32_t fastCount =
+        count / (channels * MAX_FACTOR) * channels;
+    uint_least32_t emulated = 0;
+
+    if (fastCount != 0 && self->fastForward(MAX_FACTOR * 100))
+    {
+        const uint_least32_t played =
+            discard(self, scratch, scratchSize, fastCount);
+        emulated = played * MAX_FACTOR;
+        if (played < fastCount)
+        {
+            self->fastForward(percent);
+            return emulated;
+        }
+        self->fastForward(100);
+    }
+
+    emulated += discard(self, scratch, scratchSize, count - emulated);
+    self->fastForward(percent);
+    return emulated;
+}
+
+
+void sidplayfp_fadeOut(short *buffer, uint_least32_t frames,
+    unsigned int channels, uint_least32_t remaining,
+    uint_least32_t fadeFrames)
+{
+    // Scale the frames of buffer linearly down to zero within the last
+    // fadeFrames frames. remaining is the number of frames until the end
+    // of the fade counted from the start of buffer.
+    for (uint_least32_t frame = 0; frame < frames; frame++)
+    {
+        const uint_least32_t left =
+            frame < remaining ? remaining - frame : 0;
+        if (left >= fadeFrames)
+            continue;
+
+        const float gain = (float)left / fadeFrames;
+        short *samples = buffer + frame * channels;
+        for (unsigned int channel = 0; channel < channels; channel++)
+            samples[channel] = (short)(samples[channel] * gain);
+    }
+}
+
+
+/* ********** SidTrace ********** */
+#if LIBSIDPLAYFP_VERSION_MAJ > 2 \
+    || (LIBSIDPLAYFP_VERSION_MAJ == 2 && LIBSIDPLAYFP_VERSION_MIN >= 2)
+#  define HAVE_SID_STATUS 1
+#else
+#  define HAVE_SID_STATUS 0
+#endif
+
+static const unsigned int TRACE_MAX_SIDS = 3;
+static const unsigned int TRACE_REGISTERS = 32;
+
+typedef struct {
+    uint32_t frame;
+    uint8_t chip;
+    uint8_t reg;
+    uint8_t value;
+    uint8_t reserved;
+} SidWrite;
+
+struct SidTrace {
+    std::vector<SidWrite> writes;
+    uint32_t position;
+    uint8_t registers[TRACE_MAX_SIDS][TRACE_REGISTERS];
+};
+
+SidTrace* SidTrace_new()
+{
+    SidTrace* self = new SidTrace();
+    self->position = 0;
+    memset(self->registers, 0, sizeof(self->registers));
+    return self;
+}
+
+void SidTrace_destroy(SidTrace* self)
+{
+    delete self;
+}
+
+void SidTrace_clear(SidTrace* self)
+{
+    self->writes.clear();
+    self->position = 0;
+    memset(self->registers, 0, sizeof(self->registers));
+}
+
+size_t SidTrace_size(SidTrace* self)
+{
+    return self->writes.size();
+}
+
+const SidWrite* SidTrace_data(SidTrace* self)
+{
+    return self->writes.data();
+}
+
+void SidTrace_append(SidTrace* self, const SidWrite* writes, size_t count)
+{
+    self->writes.insert(self->writes.end(), writes, writes + count);
+    if (count != 0)
+        self->position = writes[count - 1].frame;
+}
+
+bool SidTrace_supported()
+{
+    return HAVE_SID_STATUS;
+}
+
+uint32_t sidplayfp_trace(sidplayfp* self, SidTrace* trace, short *scratch,
+    uint32_t frames, uint32_t step, unsigned int factor,
+    unsigned int channels, unsigned int chips, unsigned int percent)
+{
+    // Play step output frames at a time (each emulating factor frames)
+    // and record every register which changed since the previous step.
+    // percent is the fast forward factor restored afterwards. Returns the
+    // number of emulated frames.
+#if HAVE_SID_STATUS
+    if (chips > TRACE_MAX_SIDS)
+        chips = TRACE_MAX_SIDS;
+    if (!self->fastForward(factor * 100))
+        return 0;
+
+    uint32_t emulated = 0;
+    while (emulated < frames)
+    {
+        const uint32_t played = self->play(scratch, step * channels);
+        emulated += played / channels * factor;
+        trace->position += played / channels * factor;
+
+        for (unsigned int chip = 0; chip < chips; chip++)
+        {
+            uint8_t registers[TRACE_REGISTERS];
+            if (!self->getSidStatus(chip, registers))
+                break;
+
+            uint8_t* last = trace->registers[chip];
+            for (unsigned int reg = 0; reg < TRACE_REGISTERS; reg++)
+            {
+                if (registers[reg] == last[reg])
+                    continue;
+                last[reg] = registers[reg];
+
+                SidWrite write = {
+                    trace->position, (uint8_t)chip, (uint8_t)reg,
+                    registers[reg], 0};
+                trace->writes.push_back(write);
+            }
+        }
+
+        if (played < step * channels)
+            break;
+    }
+    self->fastForward(percent);
+    return emulated;
+#else
+    return 0;
+#endif
+}
+
+uint32_t sidplayfp_analyze(sidplayfp* self, short *scratch, uint32_t steps,
+    uint32_t step, unsigned int factor, unsigned int channels,
+    unsigned int chips, unsigned int percent, uint32_t *hashes,
+    uint16_t *peaks)
+{
+    // Play steps chunks of step output frames (each emulating factor
+    // frames). After every chunk store the peak amplitude of its output
+    // and a hash (FNV-1a) of the writable registers of all sids; the hash
+    // is 0 if libsidplayfp can not report the registers. percent is the
+    // fast forward factor restored afterwards. Returns the number of
+    // completed steps.
+    static const unsigned int WRITABLE_REGISTERS = 0x19;
+
+    if (chips > TRACE_MAX_SIDS)
+        chips = TRACE_MAX_SIDS;
+    if (!self->fastForward(factor * 100))
+        return 0;
+
+    uint32_t done = 0;
+    for (; done < steps; done++)
+    {
+        const uint32_t count = step * channels;
+        const uint32_t played = self->play(scratch, count);
+        if (played < count)
+            break;
+
+        int peak = 0;
+        for (uint32_t i = 0; i < played; i++)
+        {
+            const int sample = scratch[i] < 0 ? -scratch[i] : scratch[i];
+            if (sample > peak)
+                peak = sample;
+        }
+        peaks[done] = (uint16_t)peak;
+
+        uint32_t hash = 0;
+#if HAVE_SID_STATUS
+        hash = 2166136261u;
+        for (unsigned int chip = 0; chip < chips; chip++)
+        {
+            uint8_t registers[TRACE_REGISTERS];
+            if (!self->getSidStatus(chip, registers))
+                break;
+            for (unsigned int reg = 0; reg < WRITABLE_REGISTERS; reg++)
+                hash = (hash ^ registers[reg]) * 16777619u;
+        }
+#endif
+        hashes[done] = hash;
+    }
+    self->fastForward(percent);
+    return done;
+}
+
 
 /* ********** SidTune ********** */
 static const int MD5_LENGTH = SidTune::MD5_LENGTH;
@@ -181,6 +473,15 @@ const char* SidTune_createMD5(SidTune* self, char *md5 = 0)
     return self->createMD5(md5);
 }
 
+const char* SidTune_createMD5New(SidTune* self, char *md5 = 0)
+{
+#if LIBSIDPLAYFP_VERSION_MAJ >= 2
+    return self->createMD5New(md5);
+#else
+    return 0;
+#endif
+}
+
 const uint_least8_t* SidTune_c64Data(SidTune* self)
 {
     return self->c64Data();
@@ -334,6 +635,98 @@ const char* SidTuneInfo_infoFileName(SidTuneInfo* self)
     return self->infoFileName();
 }
 
+typedef struct {
+    uint_least16_t loadAddr;
+    uint_least16_t initAddr;
+    uint_least16_t playAddr;
+    unsigned int songs;
+    unsigned int startSong;
+    unsigned int currentSong;
+    int sidChips;
+    int songSpeed;
+    uint_least8_t relocStartPage;
+    uint_least8_t relocPages;
+    uint_least16_t sidChipBase[3];
+    sid_model_t sidModel[3];
+    sid_compatibility_t compatibility;
+    unsigned int numberOfInfoStrings;
+    const char* infoString[8];
+    unsigned int numberOfCommentStrings;
+    uint_least32_t dataFileLen;
+    uint_least32_t c64dataLen;
+    sid_clock_t clockSpeed;
+    const char* formatString;
+    bool fixLoad;
+    const char* path;
+    const char* dataFileName;
+    const char* infoFileName;
+} SidTuneInfoRecord;
+
+void SidTuneInfo_getRecord(const SidTuneInfo* self, SidTuneInfoRecord* record)
+{
+    record->loadAddr = self->loadAddr();
+    record->initAddr = self->initAddr();
+    record->playAddr = self->playAddr();
+    record->songs = self->songs();
+    record->startSong = self->startSong();
+    record->currentSong = self->currentSong();
+    record->sidChips = self->sidChips();
+    record->songSpeed = self->songSpeed();
+    record->relocStartPage = self->relocStartPage();
+    record->relocPages = self->relocPages();
+
+    const unsigned int maxSids =
+        sizeof(record->sidChipBase) / sizeof(record->sidChipBase[0]);
+    for (unsigned int i = 0; i < maxSids; i++)
+    {
+        const bool used = int(i) < record->sidChips;
+        record->sidChipBase[i] = used ? self->sidChipBase(i) : 0;
+        record->sidModel[i] =
+            used ? sid_model_t(self->sidModel(i)) : SIDMODEL_UNKNOWN;
+    }
+
+    record->compatibility = sid_compatibility_t(self->compatibility());
+
+    // pointers to strings stay valid as long as the tune is not changed
+    const unsigned int maxInfoStrings =
+        sizeof(record->infoString) / sizeof(record->infoString[0]);
+    record->numberOfInfoStrings = self->numberOfInfoStrings();
+    for (unsigned int i = 0; i < maxInfoStrings; i++)
+    {
+        record->infoString[i] =
+            i < record->numberOfInfoStrings ? self->infoString(i) : 0;
+    }
+    record->numberOfCommentStrings = self->numberOfCommentStrings();
+
+    record->dataFileLen = self->dataFileLen();
+    record->c64dataLen = self->c64dataLen();
+    record->clockSpeed = sid_clock_t(self->clockSpeed());
+    record->formatString = self->formatString();
+    record->fixLoad = self->fixLoad();
+    record->path = self->path();
+    record->dataFileName = self->dataFileName();
+    record->infoFileName = self->infoFileName();
+}
+
+unsigned int SidTune_getInfoRecords(SidTune* self,
+    SidTuneInfoRecord* records, unsigned int count, char *md5)
+{
+    // Fill a record for each subtune (at most count) and the MD5 (if md5
+    // is not NULL) while restoring the selected song afterwards.
+    const unsigned int currentSong = self->getInfo()->currentSong();
+    unsigned int songs = self->getInfo()->songs();
+    if (songs > count)
+        songs = count;
+
+    for (unsigned int song = 1; song <= songs; song++)
+        SidTuneInfo_getRecord(self->getInfo(song), &records[song - 1]);
+    self->selectSong(currentSong);
+
+    if (md5 != 0)
+        self->createMD5(md5);
+    return songs;
+}
+
 
 /* ********** SidTuneInfo ********** */
 typedef enum {MONO = 1,  STEREO} playback_t;
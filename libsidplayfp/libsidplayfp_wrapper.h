@@ -47,10 +47,47 @@ void sidplayfp_debug(sidplayfp* self, bool enable, FILE* out);
 void sidplayfp_mute(sidplayfp* self, unsigned int sidNum, unsigned int voice,
     bool enable);
 uint_least32_t sidplayfp_time(sidplayfp* self);
+uint_least32_t sidplayfp_timeMs(sidplayfp* self);
 void sidplayfp_setRoms(sidplayfp* self, const uint8_t* kernal,
     const uint8_t* basic, const uint8_t* character);
 uint_least16_t sidplayfp_getCia1TimerA(sidplayfp* self);
-
+uint_least32_t sidplayfp_render(sidplayfp* self, short *buffer,
+    uint_least32_t count, uint_least32_t chunkSize);
+uint_least32_t sidplayfp_playFloat(sidplayfp* self, float *buffer,
+    short *scratch, uint_least32_t count);
+uint_least32_t sidplayfp_seek(sidplayfp* self, short *scratch,
+    uint_least32_t scratchSize, uint_least32_t count,
+    unsigned int channels, unsigned int percent);
+
+void sidplayfp_fadeOut(short *buffer, uint_least32_t frames,
+    unsigned int channels, uint_least32_t remaining,
+    uint_least32_t fadeFrames);
+
+
+// SidTrace
+typedef struct {
+    uint32_t frame;
+    uint8_t chip;
+    uint8_t reg;
+    uint8_t value;
+    uint8_t reserved;
+} SidWrite;
+typedef struct SidTrace SidTrace;
+
+SidTrace* SidTrace_new();
+void SidTrace_destroy(SidTrace* self);
+void SidTrace_clear(SidTrace* self);
+size_t SidTrace_size(SidTrace* self);
+const SidWrite* SidTrace_data(SidTrace* self);
+void SidTrace_append(SidTrace* self, const SidWrite* writes, size_t count);
+bool SidTrace_supported();
+uint32_t sidplayfp_trace(sidplayfp* self, SidTrace* trace, short *scratch,
+    uint32_t frames, uint32_t step, unsigned int factor,
+    unsigned int channels, unsigned int chips, unsigned int percent);
+uint32_t sidplayfp_analyze(sidplayfp* self, short *scratch, uint32_t steps,
+    uint32_t step, unsigned int factor, unsigned int channels,
+    unsigned int chips, unsigned int percent, uint32_t *hashes,
+    uint16_t *peaks);
 
 // SidTune
 static const int MD5_LENGTH;
@@ -71,6 +108,7 @@ bool SidTune_getStatus(SidTune* self);
 const char* SidTune_statusString(SidTune* self);
 // bool SidTune_placeSidTuneInC64mem(SidTune* self, sidmemory* mem);
 const char* SidTune_createMD5(SidTune* self, char *md5);
+const char* SidTune_createMD5New(SidTune* self, char *md5);
 const uint_least8_t* SidTune_c64Data(SidTune* self);
 
 
@@ -116,6 +154,37 @@ const char* SidTuneInfo_path(SidTuneInfo* self);
 const char* SidTuneInfo_dataFileName(SidTuneInfo* self);
 const char* SidTuneInfo_infoFileName(SidTuneInfo* self);
 
+typedef struct {
+    uint_least16_t loadAddr;
+    uint_least16_t initAddr;
+    uint_least16_t playAddr;
+    unsigned int songs;
+    unsigned int startSong;
+    unsigned int currentSong;
+    int sidChips;
+    int songSpeed;
+    uint_least8_t relocStartPage;
+    uint_least8_t relocPages;
+    uint_least16_t sidChipBase[...];
+    sid_model_t sidModel[...];
+    sid_compatibility_t compatibility;
+    unsigned int numberOfInfoStrings;
+    const char* infoString[...];
+    unsigned int numberOfCommentStrings;
+    uint_least32_t dataFileLen;
+    uint_least32_t c64dataLen;
+    sid_clock_t clockSpeed;
+    const char* formatString;
+    bool fixLoad;
+    const char* path;
+    const char* dataFileName;
+    const char* infoFileName;
+} SidTuneInfoRecord;
+
+void SidTuneInfo_getRecord(SidTuneInfo* self, SidTuneInfoRecord* record);
+unsigned int SidTune_getInfoRecords(SidTune* self,
+    SidTuneInfoRecord* records, unsigned int count, char *md5);
+
 
 // SidConfig
 typedef enum {MONO = 1,  STEREO} playback_t;
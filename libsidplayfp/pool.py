@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import threading
+from collections import OrderedDict
+
+from libsidplayfp.libsidplayfp import SidTune
+
+
+def _key(path):
+    return os.path.abspath(os.fsdecode(path))
+
+
+def _md5_key(md5):
+    # tunes added without a key are stored under their MD5, which can not
+    # collide with the (string) keys of paths
+    return ('md5', os.fsencode(md5))
+
+
+class _Entry:
+    """Internally used to store a tune together with its size and MD5."""
+
+    def __init__(self, key, tune, md5):
+        self.key = key
+        self.tune = tune
+        self.md5 = md5
+        self.size = tune.get_info().data_file_len
+
+
+class TunePool:
+    """
+    LRU cache of loaded :py:class:`SidTune` objects.
+
+    Tunes are looked up by path with :py:func:`get` or by MD5 with
+    :py:func:`get_md5`. If more than ``max_tunes`` tunes are cached or the
+    size of all cached sidtune files exceeds ``max_bytes``, the least
+    recently used tunes are dropped. ``cache`` is passed on to every loaded
+    :py:class:`SidTune`.
+
+    Dropping a tune only removes it from the pool. A :py:class:`SidPlayfp`
+    which has loaded it keeps its own reference, so evicted tunes stay
+    valid as long as they are used.
+
+    All methods are thread-safe.
+    """
+
+    def __init__(self, max_tunes=64, max_bytes=None, cache=None):
+        self.max_tunes = max_tunes
+        self.max_bytes = max_bytes
+        self.cache = cache
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = OrderedDict()
+        self._md5s = {}
+        self._size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        entries = self._entries
+        return _md5_key(key) in entries or _key(key) in entries
+
+    @property
+    def size(self):
+        """Size of all cached sidtune files in bytes."""
+        return self._size
+
+    def get(self, path):
+        """
+        Return the tune loaded from ``path``. It is loaded on the first
+        request and taken from the pool afterwards. ``path`` may also be the
+        MD5 of a tune added without a key.
+
+        :raises SidTuneError: if loading the tune fails
+        """
+        with self._lock:
+            key = _md5_key(path)
+            entry = self._entries.get(key)
+            if entry is None:
+                key = _key(path)
+                entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.tune
+
+            self.misses += 1
+            tune = SidTune(os.fsencode(key), cache=self.cache)
+            self._insert(key, tune)
+            return tune
+
+    def get_md5(self, md5):
+        """
+        Return the cached tune with the given MD5 (as returned by
+        :py:func:`SidTune.create_MD5`) or ``None`` if it is not cached.
+        """
+        with self._lock:
+            entry = self._md5s.get(md5)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry.key)
+            self.hits += 1
+            return entry.tune
+
+    def add(self, tune, key=None):
+        """
+        Add a tune, e.g. one created from a buffer, to the pool. If ``key``
+        is ``None``, the MD5 of the tune (as returned by
+        :py:func:`SidTune.create_MD5`) is used as key.
+        """
+        with self._lock:
+            if key is None:
+                key = _md5_key(tune.create_MD5())
+            else:
+                key = _key(key)
+            self._remove(key)
+            self._insert(key, tune)
+
+    def load(self, player, path, song=0):
+        """
+        Select ``song`` of the tune at ``path`` and load it into ``player``.
+
+        Selecting a song changes the shared tune, so both steps are done
+        while holding the lock of the pool. Use this method if tunes of the
+        pool are played by several threads.
+
+        :returns: the loaded tune
+        :raises SidTuneError: if loading the tune fails
+        :raises SidPlayfpLoadError: if the player can not load the tune
+        """
+        with self._lock:
+            tune = self.get(path)
+            tune.select_song(song)
+            player.load(tune)
+            return tune
+
+    def invalidate(self, path):
+        """
+        Drop the tune loaded from ``path``, e.g. after it changed, or the
+        tune added without a key with the MD5 ``path``.
+        """
+        with self._lock:
+            self._remove(_md5_key(path))
+            self._remove(_key(path))
+
+    def clear(self):
+        """Drop all tunes."""
+        with self._lock:
+            self._entries.clear()
+            self._md5s.clear()
+            self._size = 0
+
+    def _insert(self, key, tune):
+        entry = _Entry(key, tune, tune.create_MD5())
+        self._entries[key] = entry
+        self._md5s[entry.md5] = entry
+        self._size += entry.size
+
+        while len(self._entries) > 1 and (
+                (self.max_tunes is not None
+                 and len(self._entries) > self.max_tunes)
+                or (self.max_bytes is not None
+                    and self._size > self.max_bytes)):
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if self._md5s.get(entry.md5) is entry:
+            del self._md5s[entry.md5]
+        self._size -= entry.size
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Read the header of PSID and RSID files in pure Python, following the rules
+of libsidplayfp. No engine is needed, so this module does not load the
+compiled extension module.
+"""
+import hashlib
+import os
+import struct
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from libsidplayfp.errors import SidTuneError
+
+
+PsidInfo = namedtuple('PsidInfo', [
+    'path', 'md5', 'format_string', 'info_strings', 'comment_strings',
+    'songs', 'start_song', 'song_speeds', 'load_addr', 'init_addr',
+    'play_addr', 'sid_chips', 'sid_chip_bases', 'sid_models',
+    'compatibility', 'clock_speed', 'reloc_start_page', 'reloc_pages',
+    'data_file_len', 'c64data_len', 'fix_load', 'version'])
+PsidInfo.__doc__ = """\
+Header of a PSID or RSID file as returned by :py:func:`parse_psid`.
+
+The fields match :py:class:`~libsidplayfp.scan.TuneRecord`, but
+``sid_models``, ``compatibility`` and ``clock_speed`` hold the integer
+values of :py:class:`SidModel`, :py:class:`SidCompatibility` and
+:py:class:`SidClock`. ``version`` is the version of the file format.
+"""
+
+# values of the corresponding constants of libsidplayfp
+CLOCK_UNKNOWN, CLOCK_PAL, CLOCK_NTSC, CLOCK_ANY = range(4)
+SIDMODEL_UNKNOWN, SIDMODEL_6581, SIDMODEL_8580, SIDMODEL_ANY = range(4)
+(COMPATIBILITY_C64, COMPATIBILITY_PSID, COMPATIBILITY_R64,
+ COMPATIBILITY_BASIC) = range(4)
+SPEED_VBI = 0
+SPEED_CIA_1A = 60
+
+FORMAT_PSID = b'PlaySID one-file format (PSID)'
+FORMAT_RSID = b'Real C64 one-file format (RSID)'
+
+MAX_SONGS = 256
+MAX_MEMORY = 65536
+R64_MIN_LOAD_ADDR = 0x07e8
+
+# magic, version, data offset, load, init and play address, songs, start
+# song, speed, name, author, released
+_HEADER_V1 = struct.Struct('>4sHHHHHHHI32s32s32s')
+# flags, start page and length of the relocation range, second and third
+# sid address
+_HEADER_V2 = struct.Struct('>HBBBB')
+
+_FLAG_MUS = 1 << 0
+_FLAG_SPECIFIC = 1 << 1
+_FLAG_BASIC = 1 << 1
+_FLAG_CLOCK = 3 << 2
+
+
+def _string(field):
+    return field.split(b'\0', 1)[0]
+
+
+def _valid_sid_address(address):
+    # only even values outside of $00-$41 ($d000-$d410) and $80-$df
+    # ($d800-$ddf0) are valid
+    if address & 1:
+        return False
+    return not (address <= 0x41 or 0x80 <= address <= 0xdf)
+
+
+def _relocation(start_page, pages, load_addr, c64data_len):
+    """
+    Return the fixed relocation range or ``None`` if it is invalid.
+    """
+    if start_page == 0xff:
+        return start_page, 0
+    if pages == 0:
+        return 0, pages
+
+    end_page = (start_page + pages - 1) & 0xff
+    if end_page < start_page:
+        return None
+
+    # the range must not overlap the load range ...
+    load_start = load_addr >> 8
+    load_end = (load_start + ((c64data_len - 1) >> 8)) & 0xff
+    if (start_page <= load_start <= end_page
+            or start_page <= load_end <= end_page):
+        return None
+
+    # ... or $0000-$03ff, $a000-$bfff and $d000-$ffff
+    for page in (start_page, end_page):
+        if page < 0x04 or 0xa0 <= page <= 0xbf or page >= 0xd0:
+            return None
+    return start_page, pages
+
+
+def _md5(c64data, init_addr, play_addr, songs, song_speeds, clock_speed):
+    # same as SidTune::createMD5() of libsidplayfp
+    md5 = hashlib.md5(c64data)
+    md5.update(struct.pack('<HHH', init_addr, play_addr, songs))
+    md5.update(bytes(song_speeds))
+    if clock_speed == CLOCK_NTSC:
+        md5.update(b'\x02')
+    return md5.hexdigest().encode('ascii')
+
+
+def parse_psid(data, path=None):
+    """
+    Parse the PSID or RSID file ``data`` (a bytes-like object) and return
+    a :py:class:`PsidInfo`. ``md5`` is computed like
+    :py:func:`SidTune.create_MD5`.
+
+    :raises SidTuneError: if ``data`` is not a valid PSID or RSID file
+    """
+    data = memoryview(data).cast('B')
+    if len(data) < _HEADER_V1.size:
+        raise SidTuneError('Could not determine file format')
+
+    (magic, version, data_offset, load_addr, init_addr, play_addr, songs,
+     start_song, speed, name, author, released) = _HEADER_V1.unpack_from(data)
+
+    if magic == b'PSID' and 1 <= version <= 4:
+        format_string = FORMAT_PSID
+        if version == 1:
+            compatibility = COMPATIBILITY_PSID
+        else:
+            compatibility = COMPATIBILITY_C64
+    elif magic == b'RSID' and 2 <= version <= 4:
+        format_string = FORMAT_RSID
+        compatibility = COMPATIBILITY_R64
+    elif magic in (b'PSID', b'RSID'):
+        raise SidTuneError(
+            'Unsupported {} version'.format(magic.decode('ascii')))
+    else:
+        raise SidTuneError('Could not determine file format')
+
+    clock_speed = CLOCK_UNKNOWN
+    sid_models = [SIDMODEL_UNKNOWN]
+    sid_chip_bases = [0xd400]
+    reloc_start_page = reloc_pages = 0
+
+    if version >= 2:
+        if len(data) < _HEADER_V1.size + _HEADER_V2.size:
+            raise SidTuneError('File is incomplete or corrupt')
+        flags, reloc_start_page, reloc_pages, second, third = \
+            _HEADER_V2.unpack_from(data, _HEADER_V1.size)
+
+        # libsidplayfp does not play Compute!'s Sidplayer tunes
+        if flags & _FLAG_MUS:
+            raise SidTuneError('MUS data is not supported')
+        clock_speed = (flags & _FLAG_CLOCK) >> 2
+
+        if compatibility == COMPATIBILITY_C64 and flags & _FLAG_SPECIFIC:
+            compatibility = COMPATIBILITY_PSID
+        elif compatibility == COMPATIBILITY_R64 and flags & _FLAG_BASIC:
+            compatibility = COMPATIBILITY_BASIC
+
+        sid_models = [(flags >> 4) & 3]
+        if version >= 3 and _valid_sid_address(second):
+            sid_chip_bases.append(0xd000 | second << 4)
+            sid_models.append((flags >> 6) & 3)
+        if (version >= 4 and third != second
+                and _valid_sid_address(third)):
+            sid_chip_bases.append(0xd000 | third << 4)
+            sid_models.append((flags >> 8) & 3)
+
+    if format_string == FORMAT_RSID:
+        if load_addr != 0 or play_addr != 0 or speed != 0:
+            raise SidTuneError('File contains invalid data')
+        # real C64 tunes appear as CIA
+        speed = 0xffffffff
+
+    songs = min(songs, MAX_SONGS) or 1
+    if not 1 <= start_song <= songs:
+        start_song = 1
+
+    # bit n of speed selects the speed of song n + 1, all songs after the
+    # 32nd use the same speed as the 32nd, except for PSID specific tunes,
+    # which start again with bit 0 (like PlaySID)
+    if compatibility == COMPATIBILITY_PSID:
+        bits = [song & 31 for song in range(songs)]
+    else:
+        bits = [min(song, 31) for song in range(songs)]
+    song_speeds = tuple(
+        SPEED_CIA_1A if speed >> bit & 1 else SPEED_VBI for bit in bits)
+
+    if play_addr == 0xffff:
+        play_addr = 0
+
+    c64data_len = len(data) - data_offset
+    if c64data_len < 0:
+        raise SidTuneError('File is incomplete or corrupt')
+    if load_addr == 0:
+        if c64data_len < 2:
+            raise SidTuneError('File is incomplete or corrupt')
+        load_addr = data[data_offset] | data[data_offset + 1] << 8
+        data_offset += 2
+        c64data_len -= 2
+
+    if compatibility == COMPATIBILITY_BASIC:
+        if init_addr != 0:
+            raise SidTuneError('Bad address data')
+    elif init_addr == 0:
+        init_addr = load_addr
+
+    relocation = _relocation(
+        reloc_start_page, reloc_pages, load_addr, c64data_len)
+    if relocation is None:
+        raise SidTuneError('Bad reloc data')
+    reloc_start_page, reloc_pages = relocation
+
+    if compatibility == COMPATIBILITY_R64:
+        if (init_addr >> 12 in (0x0a, 0x0b, 0x0d, 0x0e, 0x0f)
+                or not load_addr <= init_addr < load_addr + c64data_len
+                or load_addr < R64_MIN_LOAD_ADDR):
+            raise SidTuneError('Bad address data')
+
+    if c64data_len > MAX_MEMORY:
+        raise SidTuneError('Size exceeds C64 memory')
+    if c64data_len <= 0:
+        raise SidTuneError('File contains no data')
+
+    c64data = data[data_offset:]
+    fix_load = (c64data_len >= 2
+                and c64data[0] | c64data[1] << 8 == load_addr + 2)
+
+    return PsidInfo(
+        path=path,
+        md5=_md5(c64data, init_addr, play_addr, songs, song_speeds,
+                 clock_speed),
+        format_string=format_string,
+        info_strings=(_string(name), _string(author), _string(released)),
+        comment_strings=(),
+        songs=songs,
+        start_song=start_song,
+        song_speeds=song_speeds,
+        load_addr=load_addr,
+        init_addr=init_addr,
+        play_addr=play_addr,
+        sid_chips=len(sid_chip_bases),
+        sid_chip_bases=tuple(sid_chip_bases),
+        sid_models=tuple(sid_models),
+        compatibility=compatibility,
+        clock_speed=clock_speed,
+        reloc_start_page=reloc_start_page,
+        reloc_pages=reloc_pages,
+        data_file_len=len(data),
+        c64data_len=c64data_len,
+        fix_load=fix_load,
+        version=version)
+
+
+def create_MD5_new(data):
+    """
+    Return the MD5 of the PSID or RSID file ``data`` like
+    :py:func:`SidTune.create_MD5_new`, which is used by songlength databases
+    of HVSC 68 and newer.
+    """
+    return hashlib.md5(data).hexdigest().encode('ascii')
+
+
+def read_psid(path):
+    """
+    Read the PSID or RSID file at ``path`` and return its
+    :py:class:`PsidInfo`.
+
+    :raises SidTuneError: if the file could not be read or is invalid
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        raise SidTuneError(str(e)) from e
+    return parse_psid(data, path)
+
+
+def _read_path(path):
+    try:
+        return read_psid(path), None
+    except SidTuneError as e:
+        return None, e
+
+
+def read_psids(paths, threads=None, on_error=None):
+    """
+    Read many files with :py:func:`read_psid` using a pool of threads, so
+    reading files overlaps with parsing. Yields a :py:class:`PsidInfo` for
+    every valid file in the order of ``paths``. If ``on_error`` is given, it
+    is called with the path and the raised :py:class:`SidTuneError` of
+    invalid files.
+    """
+    if threads is None:
+        threads = min(32, (os.cpu_count() or 1) + 4)
+
+    with ThreadPoolExecutor(threads) as executor:
+        pending = deque()
+        paths = iter(paths)
+        while True:
+            for path in paths:
+                pending.append((path, executor.submit(_read_path, path)))
+                if len(pending) >= 4 * threads:
+                    break
+            if not pending:
+                return
+
+            path, future = pending.popleft()
+            info, error = future.result()
+            if error is None:
+                yield info
+            elif on_error is not None:
+                on_error(path, error)
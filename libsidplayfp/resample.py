@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Emulate a tune once and deliver it at several sample rates and channel
+layouts. Requires numpy.
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class Resampler:
+    """
+    Convert audio from ``in_rate`` to ``out_rate`` using a polyphase FIR
+    filter (a Kaiser windowed sinc with the cutoff at ``rolloff`` times the
+    lower Nyquist frequency). Each phase has ``taps`` coefficients, times
+    the decimation ratio when converting to a lower rate.
+
+    The resampler keeps its state between calls of :py:func:`process`, so a
+    stream can be converted in chunks of any size. The output is delayed by
+    about half the filter length.
+    """
+
+    def __init__(self, in_rate, out_rate, channels=1, taps=32, rolloff=0.9,
+                 beta=8.6):
+        divisor = math.gcd(in_rate, out_rate)
+        self.up = out_rate // divisor
+        self.down = in_rate // divisor
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        # keep the transition band narrow relative to the output rate
+        taps *= max(-(-self.down // self.up), 1)
+        self.taps = taps
+
+        # prototype filter at in_rate * up, split into up phases of taps
+        # coefficients; phases[p, k] multiplies the input sample k samples
+        # before the current one, reversed to match the sliding windows
+        length = taps * self.up
+        cutoff = rolloff * 0.5 / max(self.up, self.down)
+        x = np.arange(length) - (length - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * x) * np.kaiser(length, beta)
+        h *= self.up / h.sum()
+        self._phases = np.ascontiguousarray(
+            h.reshape(taps, self.up).T[:, ::-1], dtype=np.float32)
+
+        self.reset()
+
+    def reset(self):
+        """Forget the state, e.g. before converting a new stream."""
+        self._history = np.zeros((self.taps - 1, self.channels), np.float32)
+        # number of input samples consumed and output samples produced
+        self._consumed = 0
+        self._produced = 0
+
+    def process(self, samples):
+        """
+        Convert the next chunk of ``samples``, an array of shape
+        ``(frames,)`` or ``(frames, channels)``. Returns the converted
+        samples as float32 array of shape ``(frames, channels)``.
+        """
+        samples = np.asarray(samples, np.float32).reshape(-1, self.channels)
+        buffer = np.concatenate((self._history, samples))
+        self._history = buffer[len(buffer) - (self.taps - 1):]
+
+        # outputs whose newest input sample is part of this chunk
+        end = self._consumed + len(samples)
+        stop = -(-end * self.up // self.down)
+        t = np.arange(self._produced, stop, dtype=np.int64) * self.down
+        # index of the window ending at the newest input sample
+        index = t // self.up - self._consumed
+        phase = t % self.up
+
+        self._consumed = end
+        self._produced = stop
+
+        if not len(t):
+            return np.empty((0, self.channels), np.float32)
+        windows = sliding_window_view(buffer, self.taps, axis=0)[index]
+        return np.einsum('nck,nk->nc', windows, self._phases[phase])
+
+
+def _convert(samples, dtype):
+    if dtype == np.float32:
+        return np.multiply(samples, 1 / 32768, dtype=np.float32)
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
+
+
+class _Output:
+    """Internally used to convert the rendered audio into one output."""
+
+    def __init__(self, in_rate, in_channels, out_rate, out_channels, dtype,
+                 taps):
+        self.frequency = out_rate
+        self.channels = out_channels
+        self.in_channels = in_channels
+        self.dtype = dtype
+
+        # downmix before and upmix after resampling to filter as few
+        # channels as possible
+        self.resampler = None
+        if out_rate != in_rate:
+            self.resampler = Resampler(
+                in_rate, out_rate, min(in_channels, out_channels), taps)
+
+    def process(self, frames):
+        if self.channels < self.in_channels:
+            frames = frames.mean(axis=1, keepdims=True)
+        if self.resampler is not None:
+            frames = self.resampler.process(frames)
+        if self.channels > frames.shape[1]:
+            frames = np.repeat(frames, self.channels, axis=1)
+
+        frames = _convert(frames, self.dtype)
+        if self.channels == 1:
+            return frames.reshape(-1)
+        return frames
+
+    def reset(self):
+        if self.resampler is not None:
+            self.resampler.reset()
+
+
+class MultiRateRenderer:
+    """
+    Render the audio of a :py:class:`SidPlayfp` once and convert it into
+    several ``outputs``, each given as tuple ``(frequency, channels)``.
+
+    The player emulates at its configured frequency and playback mode,
+    which should be the highest frequency and the most channels of all
+    outputs (or, for higher quality, a common multiple of the frequencies).
+    Outputs with a different frequency are resampled with a
+    :py:class:`Resampler`; stereo is mixed down to mono by averaging both
+    channels and mono is copied to both channels for stereo outputs.
+
+    Output arrays have the dtype ``dtype`` (``int16`` or ``float32``
+    normalized to ``[-1, 1)``) and shape ``(frames,)`` for mono and
+    ``(frames, 2)`` for stereo outputs.
+    """
+
+    def __init__(self, player, outputs, dtype='int16', taps=32):
+        self.player = player
+
+        config = player.config
+        self.frequency = config.frequency
+        self.channels = config.playback.value
+        dtype = np.dtype(dtype)
+        if dtype not in (np.int16, np.float32):
+            raise TypeError('dtype must be int16 or float32')
+
+        self._outputs = []
+        for frequency, channels in outputs:
+            if channels not in (1, 2):
+                raise ValueError('channels must be 1 or 2')
+            self._outputs.append(_Output(
+                self.frequency, self.channels, frequency, channels, dtype,
+                taps))
+        self._buffer = np.empty((0, self.channels), np.int16)
+
+    @property
+    def outputs(self):
+        """List of ``(frequency, channels)`` of the outputs."""
+        return [(output.frequency, output.channels)
+                for output in self._outputs]
+
+    def reset(self):
+        """
+        Forget the state of the resamplers. Call it after loading another
+        tune into the player.
+        """
+        for output in self._outputs:
+            output.reset()
+
+    def _render_chunk(self, frames):
+        buffer = self._buffer
+        if len(buffer) < frames:
+            buffer = self._buffer = np.empty(
+                (frames, self.channels), np.int16)
+
+        count = self.player.render(out=buffer[:frames])[1]
+        rendered = buffer[:count // self.channels]
+        return [output.process(rendered) for output in self._outputs]
+
+    def stream(self, chunk_seconds=0.5, duration=None):
+        """
+        Render the player in chunks of ``chunk_seconds`` until ``duration``
+        seconds have been rendered (forever if ``None``) or the player
+        stops. Yields a list with one new array for each output per chunk.
+        """
+        chunk = max(int(chunk_seconds * self.frequency), 1)
+        remaining = None
+        if duration is not None:
+            remaining = int(duration * self.frequency)
+
+        while remaining is None or remaining > 0:
+            frames = chunk if remaining is None else min(chunk, remaining)
+            converted = self._render_chunk(frames)
+            yield converted
+
+            if remaining is not None:
+                remaining -= frames
+            if not self.player.is_playing:
+                break
+
+    def render(self, seconds, chunk_seconds=0.5):
+        """
+        Render ``seconds`` of audio and return a list with one array for
+        each output.
+        """
+        chunks = list(self.stream(chunk_seconds, seconds))
+        if not chunks:
+            return [output.process(self._buffer[:0])
+                    for output in self._outputs]
+        return [np.concatenate(parts) for parts in zip(*chunks)]
+
+
+def render_multirate(tune, seconds, outputs, song=None, dtype='int16',
+                     **player_options):
+    """
+    Render ``seconds`` of ``song`` of ``tune`` into several ``outputs``
+    using a single engine. The engine is created with
+    :py:func:`~libsidplayfp.batch.create_player` at the highest frequency
+    and with the most channels of all outputs unless ``frequency`` or
+    ``playback`` are given in ``player_options``.
+    """
+    from libsidplayfp.libsidplayfp import Playback
+    from libsidplayfp.batch import create_player
+
+    player_options.setdefault(
+        'frequency', max(frequency for frequency, _ in outputs))
+    if 'playback' not in player_options:
+        stereo = any(channels == 2 for _, channels in outputs)
+        player_options['playback'] = (
+            Playback.STEREO if stereo else Playback.MONO)
+
+    player = create_player(**player_options)
+    player.reset(tune, song)
+    return MultiRateRenderer(player, outputs, dtype).render(seconds)
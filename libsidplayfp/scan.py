@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import multiprocessing
+import os
+from collections import namedtuple
+
+from libsidplayfp.cache import file_stat
+# find_tunes is part of this module's interface as well
+from libsidplayfp.files import find_tunes
+from libsidplayfp.libsidplayfp import (
+    SidTune, SidError, _info_record_values, ffi, lib)
+
+
+TuneRecord = namedtuple('TuneRecord', [
+    'path', 'md5', 'format_string', 'info_strings', 'comment_strings',
+    'songs', 'start_song', 'song_speeds', 'load_addr', 'init_addr',
+    'play_addr', 'sid_chips', 'sid_chip_bases', 'sid_models',
+    'compatibility', 'clock_speed', 'reloc_start_page', 'reloc_pages',
+    'data_file_len', 'c64data_len', 'fix_load'])
+TuneRecord.__doc__ = """\
+Compact summary of a sidtune as returned by :py:func:`scan_tune`.
+
+The fields correspond to the properties of :py:class:`SidTuneInfo`.
+``song_speeds`` contains :py:attr:`SidTuneInfo.song_speed` of every subtune.
+"""
+
+
+def scan_tune(tune, path=None):
+    """
+    Read all information about ``tune`` and its subtunes into a
+    :py:class:`TuneRecord` using a single call into the C wrapper.
+    """
+    info = tune.get_info()
+    songs = info.songs
+    records = ffi.new('SidTuneInfoRecord[]', max(songs, 1))
+    md5 = ffi.new('char[]', SidTune.MD5_LENGTH + 1)
+    songs = lib.SidTune_getInfoRecords(tune.obj, records, songs, md5)
+
+    return TuneRecord(
+        path=path,
+        md5=ffi.string(md5),
+        song_speeds=tuple(records[i].songSpeed for i in range(songs)),
+        **_info_record_values(records[0], info))
+
+
+def scan_file(path):
+    """
+    Load the sidtune at ``path`` and return its :py:class:`TuneRecord`.
+
+    :raises SidTuneError: if loading the tune fails
+    """
+    tune = SidTune(os.fsencode(path))
+    return scan_tune(tune, path)
+
+
+def _scan_path(path):
+    # the file may change while it is scanned
+    stat = file_stat(path)
+    try:
+        return path, scan_file(path), stat, None
+    except SidError as e:
+        return path, None, stat, e
+
+
+def scan_directory(root, pattern='*.sid', processes=None, chunksize=64,
+                   on_error=None, cache=None):
+    """
+    Scan all sidtunes below ``root`` in parallel using a pool of worker
+    processes and yield a :py:class:`TuneRecord` for each of them (in no
+    particular order).
+
+    Tunes which can not be loaded are skipped. If ``on_error`` is given, it
+    is called with the path and the raised :py:class:`SidError`. If
+    ``processes`` is 1, all tunes are scanned in the current process.
+
+    If a :py:class:`~libsidplayfp.cache.MetadataCache` is given, cached
+    records of unchanged files are yielded first without loading the tunes.
+    Only the remaining tunes are scanned and added to the cache.
+    """
+    paths = find_tunes(root, pattern)
+
+    if cache is not None:
+        missing = []
+        for path in paths:
+            record = cache.get(path)
+            if record is None:
+                missing.append(path)
+            else:
+                yield record
+        if not missing:
+            return
+        paths = missing
+
+    if processes == 1:
+        results = map(_scan_path, paths)
+        yield from _handle_results(results, on_error, cache)
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.imap_unordered(_scan_path, paths, chunksize)
+        yield from _handle_results(results, on_error, cache)
+
+
+def _handle_results(results, on_error, cache):
+    for path, record, stat, error in results:
+        if error is None:
+            if cache is not None:
+                cache.put(path, record, stat)
+            yield record
+        elif on_error is not None:
+            on_error(path, error)
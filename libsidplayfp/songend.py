@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import hashlib
+import sys
+from array import array
+from collections import namedtuple
+
+from libsidplayfp.libsidplayfp import ffi, lib
+from libsidplayfp.songlength import _uint32_array, songlength_entry
+
+
+SongEnd = namedtuple(
+    'SongEnd', ['length_ms', 'reason', 'loop_start_ms', 'fingerprint'])
+SongEnd.__doc__ = """\
+Result of :py:func:`detect_song_end`.
+
+``reason`` is ``'silence'``, ``'loop'`` or ``'limit'`` (nothing was found
+within the maximum duration). ``loop_start_ms`` is the position the tune
+jumps back to if a loop was found, otherwise ``None``.
+"""
+
+# same limits as SidPlayfp.trace()
+_MAX_FACTOR = 32
+_MAX_SIDS = 3
+
+# length of the sequences of states used to find loop candidates
+_NGRAM = 8
+# number of earlier positions checked per loop candidate
+_MAX_CANDIDATES = 32
+
+
+class _Analysis:
+    """
+    Internally used to find silence and loops in the per-step register
+    hashes and output peaks collected by the C wrapper.
+    """
+
+    def __init__(self, silence_steps, silence_level, min_loop_steps,
+                 match_steps):
+        self.silence_steps = silence_steps
+        self.silence_level = silence_level
+        self.min_loop_steps = min_loop_steps
+        self.match_steps = match_steps
+
+        self.steps = 0
+        self.peaks = array('H')
+        self.silence_start = 0
+        # a silent intro is not the end of the song
+        self.heard_sound = False
+
+        # register states which lasted for at least two steps (shorter
+        # ones were seen while the play routine was updating registers)
+        # together with the step they started at
+        self.states = _uint32_array()
+        self.starts = []
+        self.run_hash = None
+        self.run_start = 0
+
+        self.ngrams = {}
+        self.scanned = 0
+
+    def add(self, hashes, peaks):
+        """
+        Add the results of some steps. Returns ``(step, reason,
+        loop_start_step)`` if the end was found, otherwise ``None``.
+        """
+        for i, peak in enumerate(peaks, self.steps):
+            if peak > self.silence_level:
+                self.silence_start = i + 1
+                self.heard_sound = True
+            elif (self.heard_sound
+                    and i + 1 - self.silence_start >= self.silence_steps):
+                return self.silence_start, 'silence', None
+
+        for i, value in enumerate(hashes, self.steps):
+            if value != self.run_hash:
+                self._end_run(i)
+                self.run_hash = value
+                self.run_start = i
+
+        self.steps += len(peaks)
+        self.peaks.extend(peaks)
+        return self._find_loop()
+
+    def _end_run(self, step):
+        if self.run_hash is None or step - self.run_start < 2:
+            return
+        if self.states and self.states[-1] == self.run_hash:
+            return
+        self.states.append(self.run_hash)
+        self.starts.append(self.run_start)
+
+    def _find_loop(self):
+        states = self.states
+        starts = self.starts
+        ngrams = self.ngrams
+
+        while self.scanned + _NGRAM <= len(states):
+            j = self.scanned
+            if starts[-1] - starts[j] < self.match_steps:
+                # wait for more steps to verify candidates at j
+                return None
+
+            key = tuple(states[j:j + _NGRAM])
+            positions = ngrams.setdefault(key, [])
+            checked = 0
+            for i in positions:
+                if starts[j] - starts[i] < self.min_loop_steps:
+                    break
+                if self._matches(i, j):
+                    return starts[j], 'loop', starts[i]
+                checked += 1
+                if checked == _MAX_CANDIDATES:
+                    break
+            positions.append(j)
+            self.scanned += 1
+        return None
+
+    def _matches(self, i, j):
+        states = self.states
+        starts = self.starts
+        k = 0
+        while starts[j + k] - starts[j] < self.match_steps:
+            if states[i + k] != states[j + k]:
+                return False
+            k += 1
+        return True
+
+    def fingerprint(self, end):
+        """Return a fingerprint of everything played before ``end``."""
+        if any(self.states):
+            count = sum(1 for start in self.starts if start < end)
+            data = self.states[:count]
+            if sys.byteorder != 'little':
+                data.byteswap()
+        else:
+            # libsidplayfp can not report registers, use the envelope of
+            # the output instead
+            data = bytes(min(peak >> 8, 255) for peak in self.peaks[:end])
+        return hashlib.blake2b(bytes(data), digest_size=16).hexdigest()
+
+
+def detect_song_end(player, tune=None, song=None, max_seconds=900,
+                    silence_seconds=3, silence_level=64,
+                    min_loop_seconds=10, match_seconds=30, resolution=150,
+                    chunk_seconds=10):
+    """
+    Play a song until its end is found and return a :py:class:`SongEnd`.
+
+    The song is restarted with :py:func:`SidPlayfp.reset` (selecting
+    ``song`` of ``tune`` if given) and played in fast forward mode. The end
+    is either the start of silence lasting ``silence_seconds`` (no output
+    sample louder than ``silence_level``) or the point where the tune
+    starts to repeat itself: a loop is found when the sequence of sid
+    register states matches an earlier part at least ``min_loop_seconds``
+    before for ``match_seconds``. Registers are sampled ``resolution``
+    times per second, which should be about three times the number of
+    calls of the play routine per second.
+
+    Loops can only be detected with libsidplayfp 2.2 or newer. The player
+    is left at an undefined position.
+    """
+    player.reset(tune, song)
+
+    config = player.config
+    frequency = config.frequency
+    channels = config.playback.value
+
+    # in fast forward mode the output is averaged over factor samples,
+    # limit that to 1 ms so quiet parts are not mistaken for silence
+    frames_per_step = max(frequency // resolution, 1)
+    factor = max(min(_MAX_FACTOR, frames_per_step, frequency // 1000), 1)
+    step = max(frames_per_step // factor, 1)
+    steps_per_second = frequency / (step * factor)
+
+    def steps(seconds):
+        return max(int(seconds * steps_per_second), 1)
+
+    analysis = _Analysis(steps(silence_seconds), silence_level,
+                         steps(min_loop_seconds), steps(match_seconds))
+
+    chunk = steps(chunk_seconds)
+    scratch = ffi.new('short[]', step * channels)
+    hashes = _uint32_array(bytes(4 * chunk))
+    peaks = array('H', bytes(2 * chunk))
+    hashes_buf = ffi.cast('uint32_t*', ffi.from_buffer(hashes))
+    peaks_buf = ffi.cast('uint16_t*', ffi.from_buffer(peaks))
+
+    result = None
+    total = steps(max_seconds)
+    while result is None and analysis.steps < total:
+        count = min(chunk, total - analysis.steps)
+        done = lib.sidplayfp_analyze(
+            player.obj, scratch, count, step, factor, channels, _MAX_SIDS,
+            player._fast_forward, hashes_buf, peaks_buf)
+        result = analysis.add(hashes[:done], peaks[:done])
+        if done < count:
+            break
+
+    if result is None:
+        result = analysis.steps, 'limit', None
+    end, reason, loop_start = result
+
+    def to_ms(step):
+        return round(step * 1000 / steps_per_second)
+
+    return SongEnd(
+        to_ms(end), reason, None if loop_start is None else to_ms(loop_start),
+        analysis.fingerprint(end))
+
+
+def detect_song_lengths(player, tune, **options):
+    """
+    Detect the length of all subtunes of ``tune`` with
+    :py:func:`detect_song_end` and return a line for ``Songlengths.md5``
+    (see :py:func:`~libsidplayfp.songlength.songlength_entry`) together
+    with the list of :py:class:`SongEnd` results.
+    """
+    results = [detect_song_end(player, tune, song, **options)
+               for song in range(1, tune.get_info().songs + 1)]
+
+    md5 = tune.create_MD5_new()
+    if md5 is None:
+        md5 = tune.create_MD5()
+    entry = songlength_entry(md5, [result.length_ms for result in results])
+    return entry, results
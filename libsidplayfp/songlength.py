@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+
+from libsidplayfp.errors import SidDatabaseError
+
+
+_MAGIC = b'SLIDX2\0\0'
+# magic, number of tunes, number of song lengths, slots of the hash table
+# and flags
+_HEADER = struct.Struct('<8sIIII')
+_MD5_SIZE = 16
+
+# flag of saved indexes keyed by MD5s of SidTune.create_MD5_new()
+_FLAG_NEW_MD5 = 1
+
+# marks an unused slot of the hash table
+_EMPTY = 0xffffffff
+
+_TIME_RE = re.compile(r'^(\d+):(\d+)(?:\.(\d+))?(?:\(.*\))?$')
+
+
+def _uint32_array(data=b''):
+    a = array('I')
+    if a.itemsize != 4:
+        a = array('L')
+    a.frombytes(data)
+    return a
+
+
+def parse_time(time):
+    """
+    Parse a song length like ``'3:25'``, ``'3:25.120'`` or ``'3:25(G)'``
+    from a songlength database and return it in milliseconds.
+    """
+    match = _TIME_RE.match(time)
+    if match is None:
+        raise ValueError('invalid song length: {!r}'.format(time))
+    minutes, seconds, fraction = match.groups()
+    ms = (int(minutes) * 60 + int(seconds)) * 1000
+    if fraction:
+        ms += int(fraction[:3].ljust(3, '0'))
+    return ms
+
+
+def format_time(ms):
+    """
+    Format a song length in milliseconds like ``'3:25.120'`` as used in
+    ``Songlengths.md5``. The inverse of :py:func:`parse_time`.
+    """
+    seconds, ms = divmod(int(ms), 1000)
+    minutes, seconds = divmod(seconds, 60)
+    return '{}:{:02d}.{:03d}'.format(minutes, seconds, ms)
+
+
+def songlength_entry(md5, lengths_ms):
+    """
+    Return a line for ``Songlengths.md5`` assigning the song lengths
+    ``lengths_ms`` (in milliseconds, one per subtune) to the tune with the
+    MD5 ``md5``.
+    """
+    if not isinstance(md5, str):
+        md5 = md5.decode('ascii')
+    return '{}={}'.format(
+        md5, ' '.join(format_time(ms) for ms in lengths_ms))
+
+
+def _md5_key(md5):
+    try:
+        if not isinstance(md5, str):
+            md5 = md5.decode('ascii')
+        key = bytes.fromhex(md5)
+    except (AttributeError, UnicodeDecodeError, ValueError):
+        key = None
+    if key is None or len(key) != _MD5_SIZE:
+        raise SidDatabaseError('invalid md5: {!r}'.format(md5))
+    return key
+
+
+# MD5s are uniformly distributed, so their first bytes are a good hash
+_hash = struct.Struct('<I').unpack_from
+
+
+def _build_table(keys):
+    """
+    Internally used to build the hash table of the MD5s in ``keys``: an
+    array of a power of two slots (at least twice the number of MD5s)
+    holding the index of an MD5 or ``_EMPTY``. Collisions are resolved by
+    linear probing.
+    """
+    count = len(keys) // _MD5_SIZE
+    slots = 1
+    while slots <= 2 * count:
+        slots *= 2
+    mask = slots - 1
+
+    table = _uint32_array(b'\xff' * (4 * slots))
+    for i in range(count):
+        slot = _hash(keys, i * _MD5_SIZE)[0] & mask
+        while table[slot] != _EMPTY:
+            slot = (slot + 1) & mask
+        table[slot] = i
+    return table
+
+
+def _new_md5_default(filename):
+    # Songlengths.txt of HVSC 67 and older is keyed by the old MD5s
+    return not os.fsdecode(filename).lower().endswith('.txt')
+
+
+class SongLengthIndex:
+    """
+    In-memory index of a songlength database (``Songlengths.md5`` or the
+    older ``Songlengths.txt``) offering the same lookup interface as
+    :py:class:`SidDatabase`.
+
+    The database is parsed once into compact arrays: binary MD5s, a hash
+    table of them, offsets into a table of song lengths and the song
+    lengths in milliseconds. The index can be saved to a binary file with
+    :py:func:`save` and loaded again (memory-mapped) with :py:func:`load`,
+    which is much faster than parsing the database. Lookups use the arrays
+    directly, also when they are memory-mapped.
+
+    ``Songlengths.md5`` is keyed by :py:func:`SidTune.create_MD5_new`,
+    ``Songlengths.txt`` by :py:func:`SidTune.create_MD5`. ``new_md5``
+    tells which one is used to look up tunes; by default the old MD5 is
+    used for files ending with ``.txt`` and the new one otherwise.
+
+    If ``filename`` is given, that songlength database is parsed.
+    """
+
+    def __init__(self, filename=None, new_md5=None):
+        self.new_md5 = True
+        self._mmap = None
+        self.close()
+
+        if filename is not None:
+            self.open(filename, new_md5)
+
+    def open(self, filename, new_md5=None):
+        """
+        Parse the songlength database ``filename``.
+
+        :raises SidDatabaseError: if the database could not be read
+        """
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            raise SidDatabaseError(str(e)) from e
+        self._parse(data)
+
+        if new_md5 is None:
+            new_md5 = _new_md5_default(filename)
+        self.new_md5 = new_md5
+
+    def close(self):
+        """Release the index."""
+        self._set_arrays(
+            b'', _build_table(b''), _uint32_array(bytes(4)),
+            _uint32_array())
+
+    def _set_arrays(self, keys, table, offsets, lengths, mmap_=None):
+        if self._mmap is not None:
+            # views into the mapping have to be released before closing it
+            for view in (self._keys, self._table, self._offsets,
+                         self._lengths):
+                view.release()
+            self._mmap.close()
+
+        self._keys = keys
+        self._table = table
+        self._offsets = offsets
+        self._lengths = lengths
+        self._mmap = mmap_
+
+    def _parse(self, data):
+        entries = []
+        for lineno, line in enumerate(data.splitlines(), 1):
+            line = line.strip()
+            if not line or line[:1] in (b';', b'['):
+                continue
+
+            md5, sep, times = line.partition(b'=')
+            if not sep:
+                raise SidDatabaseError(
+                    'invalid line {} in songlength database'.format(lineno))
+            try:
+                lengths = [parse_time(t.decode('ascii'))
+                           for t in times.split()]
+            except (UnicodeDecodeError, ValueError) as e:
+                raise SidDatabaseError(
+                    'invalid line {} in songlength database: {}'.format(
+                        lineno, e)) from None
+            entries.append((_md5_key(md5.strip()), lengths))
+
+        entries.sort(key=lambda entry: entry[0])
+
+        keys = bytearray()
+        offsets = _uint32_array()
+        lengths = _uint32_array()
+        for key, song_lengths in entries:
+            if keys[-_MD5_SIZE:] == key:
+                # duplicate entry, the first one wins
+                continue
+            keys += key
+            offsets.append(len(lengths))
+            lengths.extend(song_lengths)
+        offsets.append(len(lengths))
+
+        keys = bytes(keys)
+        self._set_arrays(keys, _build_table(keys), offsets, lengths)
+
+    def __len__(self):
+        return len(self._keys) // _MD5_SIZE
+
+    def __contains__(self, md5):
+        return self._find(_md5_key(md5)) is not None
+
+    def _find(self, key):
+        table = self._table
+        keys = self._keys
+        mask = len(table) - 1
+        slot = _hash(key)[0] & mask
+        # the table is never full; counting the probes only guards against
+        # a damaged index file
+        probes = 0
+        while probes <= mask:
+            i = table[slot]
+            if i == _EMPTY:
+                return None
+            start = i * _MD5_SIZE
+            if keys[start:start + _MD5_SIZE] == key:
+                return i
+            slot = (slot + 1) & mask
+            probes += 1
+        return None
+
+    def _lookup(self, key, song_num):
+        i = self._find(key)
+        if i is None:
+            return -1
+        start = self._offsets[i]
+        end = self._offsets[i + 1]
+        if not start <= end <= len(self._lengths):
+            raise SidDatabaseError('invalid songlength index')
+        if not 1 <= song_num <= end - start:
+            return -1
+        return self._lengths[start + song_num - 1]
+
+    def _resolve(self, tune_or_md5, song_num):
+        if song_num is not None:
+            return _md5_key(tune_or_md5), song_num
+
+        tune = tune_or_md5
+        md5 = None
+        if self.new_md5:
+            md5 = tune.create_MD5_new()
+        if md5 is None:
+            # old databases or libsidplayfp without createMD5New()
+            md5 = tune.create_MD5()
+        return _md5_key(md5), tune.get_info().current_song
+
+    def length_ms(self, tune_or_md5, song_num=None):
+        """
+        Get the length of a subtune in milliseconds. See :py:func:`length`.
+
+        :raises SidDatabaseError: if the length could not be determined
+        """
+        key, song_num = self._resolve(tune_or_md5, song_num)
+        length = self._lookup(key, song_num)
+        if length == -1:
+            raise SidDatabaseError('No entry for this song found')
+        return length
+
+    def length(self, tune_or_md5, song_num=None):
+        """
+        Get the length of the selected subtune in seconds (rounded). If a
+        :py:class:`SidTune` is passed, the length of its currently selected
+        subtune is returned. Otherwise ``tune_or_md5`` is an MD5 of the kind
+        the database is keyed by (see :py:attr:`new_md5`) and ``song_num``
+        is required.
+
+        :raises SidDatabaseError: if the length could not be determined
+        """
+        return (self.length_ms(tune_or_md5, song_num) + 500) // 1000
+
+    def lengths_ms(self, md5s, song_num=1):
+        """
+        Look up the lengths of many tunes at once. ``song_num`` is either a
+        single song number used for all MD5s or a sequence of song numbers.
+        Returns an ``array('l')`` of lengths in milliseconds with -1 for
+        unknown songs.
+
+        :raises SidDatabaseError: if a loaded index file is damaged
+        """
+        if isinstance(song_num, int):
+            song_nums = [song_num] * len(md5s)
+        else:
+            song_nums = song_num
+
+        result = array('l')
+        for md5, song in zip(md5s, song_nums):
+            try:
+                key = _md5_key(md5)
+            except SidDatabaseError:
+                result.append(-1)
+            else:
+                result.append(self._lookup(key, song))
+        return result
+
+    def save(self, filename):
+        """Save the index into a binary file which can be loaded quickly."""
+        arrays = [self._table, self._offsets, self._lengths]
+        if sys.byteorder != 'little':
+            arrays = [_uint32_array(a.tobytes()) for a in arrays]
+            for a in arrays:
+                a.byteswap()
+        table, offsets, lengths = arrays
+
+        flags = _FLAG_NEW_MD5 if self.new_md5 else 0
+        with open(filename, 'wb') as f:
+            f.write(_HEADER.pack(
+                _MAGIC, len(self), len(lengths), len(table), flags))
+            f.write(self._keys)
+            f.write(table.tobytes())
+            f.write(offsets.tobytes())
+            f.write(lengths.tobytes())
+
+    @classmethod
+    def load(cls, filename, use_mmap=True):
+        """
+        Load an index saved by :py:func:`save`. If ``use_mmap`` is true, the
+        file is memory-mapped instead of read into memory.
+
+        :raises SidDatabaseError: if the file could not be read or is not a
+            valid index
+        """
+        try:
+            with open(filename, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                if size < _HEADER.size:
+                    raise SidDatabaseError('invalid songlength index')
+                if use_mmap and sys.byteorder == 'little':
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    data = f.read()
+        except (OSError, ValueError) as e:
+            raise SidDatabaseError(str(e)) from e
+
+        view = memoryview(data)
+        magic, count, total, slots, flags = _HEADER.unpack_from(view)
+        keys_end = _HEADER.size + count * _MD5_SIZE
+        table_end = keys_end + slots * 4
+        offsets_end = table_end + (count + 1) * 4
+        if (magic != _MAGIC or slots <= count or slots & (slots - 1)
+                or len(view) != offsets_end + total * 4):
+            view.release()
+            if isinstance(data, mmap.mmap):
+                data.close()
+            raise SidDatabaseError('invalid songlength index')
+
+        keys = view[_HEADER.size:keys_end]
+        arrays = (view[keys_end:table_end], view[table_end:offsets_end],
+                  view[offsets_end:])
+        if isinstance(data, mmap.mmap):
+            table, offsets, lengths = (a.cast('I') for a in arrays)
+        else:
+            table, offsets, lengths = (_uint32_array(a) for a in arrays)
+            if sys.byteorder != 'little':
+                for a in (table, offsets, lengths):
+                    a.byteswap()
+
+        index = cls()
+        index.new_md5 = bool(flags & _FLAG_NEW_MD5)
+        index._set_arrays(
+            keys, table, offsets, lengths,
+            data if isinstance(data, mmap.mmap) else None)
+        return index
+
+    def __getstate__(self):
+        return (bytes(self._keys), bytes(self._table), bytes(self._offsets),
+                bytes(self._lengths), self.new_md5)
+
+    def __setstate__(self, state):
+        keys, table, offsets, lengths, self.new_md5 = state
+        self._keys = keys
+        self._table = _uint32_array(table)
+        self._offsets = _uint32_array(offsets)
+        self._lengths = _uint32_array(lengths)
+        self._mmap = None
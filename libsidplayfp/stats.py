@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import time
+from collections import namedtuple
+
+
+PlayerStatsSnapshot = namedtuple('PlayerStatsSnapshot', [
+    'play_calls', 'samples', 'play_wall', 'play_cpu', 'max_play_wall',
+    'audio_seconds', 'realtime_factor', 'slow_calls', 'short_calls',
+    'load_calls', 'load_wall', 'max_load_wall',
+    'configure_calls', 'configure_wall', 'max_configure_wall'])
+PlayerStatsSnapshot.__doc__ = """\
+Counters of a :py:class:`PlayerStats` at a point in time. Times are in
+seconds.
+"""
+
+
+def _played_samples(result):
+    return result
+
+
+def _rendered_samples(result):
+    return result[1]
+
+
+def _play_request(stats, buffer, length=None):
+    if length is None:
+        return len(buffer) // 2
+    return length
+
+
+def _play_into_request(stats, array):
+    return array.size
+
+
+def _render_request(stats, seconds=None, samples=None, out=None,
+                    chunk_size=0):
+    # same as SidPlayfp.render()
+    if seconds is not None:
+        return int(seconds * stats._frequency) * stats._channels
+    if samples is not None:
+        return samples
+    if out is not None:
+        return memoryview(out).nbytes // 2
+    return None
+
+
+# methods producing samples, with functions returning the number of
+# produced samples from their result and the number of requested samples
+# from the statistics and the arguments (None if unknown)
+_PLAY_METHODS = (
+    ('play', _played_samples, _play_request),
+    ('play_into', _played_samples, _play_into_request),
+    ('render', _rendered_samples, _render_request),
+)
+
+
+class PlayerStats:
+    """
+    Opt-in instrumentation of a :py:class:`SidPlayfp`.
+
+    While attached, the methods of the player producing samples
+    (:py:func:`~SidPlayfp.play`, :py:func:`~SidPlayfp.play_into` and
+    :py:func:`~SidPlayfp.render`), :py:func:`~SidPlayfp.load` and
+    :py:func:`~SidPlayfp.configure` are replaced by timed wrappers stored in
+    the instance. Detaching restores the previous methods, so a player
+    without attached statistics runs without any overhead. Several instances
+    may be attached to the same player if they are detached in the reverse
+    order.
+
+    ``hook`` is called after every instrumented call with the event
+    (``'play'``, ``'load'`` or ``'configure'``), the wall and CPU time
+    (of the calling thread) in seconds and the number of produced samples.
+    """
+
+    def __init__(self, player, hook=None):
+        self.player = player
+        self.hook = hook
+        self._attached = False
+        self._saved = None
+        self._frequency = None
+        self._channels = None
+        self._samples_per_second = None
+        self.reset()
+
+    def reset(self):
+        """Reset all counters."""
+        self.play_calls = 0
+        self.samples = 0
+        self.play_wall = 0.0
+        self.play_cpu = 0.0
+        self.max_play_wall = 0.0
+        self.audio_seconds = 0.0
+        self.slow_calls = 0
+        self.short_calls = 0
+        self.load_calls = 0
+        self.load_wall = 0.0
+        self.max_load_wall = 0.0
+        self.configure_calls = 0
+        self.configure_wall = 0.0
+        self.max_configure_wall = 0.0
+
+    @property
+    def attached(self):
+        return self._attached
+
+    def attach(self):
+        """Start recording calls of the player."""
+        if self._attached:
+            return
+        player = self.player
+        self._update_rate()
+
+        # methods replaced by other instances attached to the same player
+        # are restored when detaching
+        names = [name for name, _, _ in _PLAY_METHODS]
+        self._saved = {name: player.__dict__[name]
+                       for name in names + ['load', 'configure']
+                       if name in player.__dict__}
+
+        for name, samples, request in _PLAY_METHODS:
+            setattr(player, name,
+                    self._wrap_play(getattr(player, name), samples, request))
+        player.load = self._wrap(player.load, self._record_load)
+        player.configure = self._wrap(
+            player.configure, self._record_configure)
+        self._attached = True
+
+    def detach(self):
+        """Stop recording and restore the methods of the player."""
+        if not self._attached:
+            return
+        names = [name for name, _, _ in _PLAY_METHODS]
+        for name in names + ['load', 'configure']:
+            if name in self._saved:
+                setattr(self.player, name, self._saved[name])
+            else:
+                self.player.__dict__.pop(name, None)
+        self._saved = None
+        self._attached = False
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.detach()
+
+    def _update_rate(self):
+        config = self.player.config
+        self._frequency = config.frequency
+        self._channels = config.playback.value
+        self._samples_per_second = self._frequency * self._channels
+
+    def _wrap_play(self, method, count_samples, requested_samples):
+        perf_counter = time.perf_counter
+        thread_time = time.thread_time
+
+        def wrapper(*args, **kwargs):
+            start_cpu = thread_time()
+            start = perf_counter()
+            result = method(*args, **kwargs)
+            wall = perf_counter() - start
+            cpu = thread_time() - start_cpu
+
+            samples = count_samples(result)
+            requested = requested_samples(self, *args, **kwargs)
+            self._record_play(samples, requested, wall, cpu)
+            return result
+
+        return wrapper
+
+    def _wrap(self, method, record):
+        perf_counter = time.perf_counter
+        thread_time = time.thread_time
+
+        def wrapper(*args, **kwargs):
+            start_cpu = thread_time()
+            start = perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                wall = perf_counter() - start
+                record(wall, thread_time() - start_cpu)
+
+        return wrapper
+
+    def _record_play(self, samples, requested, wall, cpu):
+        self.play_calls += 1
+        self.samples += samples
+        self.play_wall += wall
+        self.play_cpu += cpu
+        if wall > self.max_play_wall:
+            self.max_play_wall = wall
+
+        # a call taking longer than the audio it produced would let a
+        # real-time output run dry
+        audio = samples / self._samples_per_second
+        self.audio_seconds += audio
+        if wall > audio:
+            self.slow_calls += 1
+        if requested is not None and samples < requested:
+            self.short_calls += 1
+
+        if self.hook is not None:
+            self.hook('play', wall, cpu, samples)
+
+    def _record_load(self, wall, cpu):
+        self.load_calls += 1
+        self.load_wall += wall
+        if wall > self.max_load_wall:
+            self.max_load_wall = wall
+        if self.hook is not None:
+            self.hook('load', wall, cpu, 0)
+
+    def _record_configure(self, wall, cpu):
+        # the sample rate and number of channels may have changed
+        self._update_rate()
+        self.configure_calls += 1
+        self.configure_wall += wall
+        if wall > self.max_configure_wall:
+            self.max_configure_wall = wall
+        if self.hook is not None:
+            self.hook('configure', wall, cpu, 0)
+
+    @property
+    def realtime_factor(self):
+        """Seconds of produced audio per second of wall time."""
+        if self.play_wall == 0:
+            return None
+        return self.audio_seconds / self.play_wall
+
+    def snapshot(self):
+        """Return the current counters as :py:class:`PlayerStatsSnapshot`."""
+        return PlayerStatsSnapshot(
+            self.play_calls, self.samples, self.play_wall, self.play_cpu,
+            self.max_play_wall, self.audio_seconds, self.realtime_factor,
+            self.slow_calls, self.short_calls,
+            self.load_calls, self.load_wall, self.max_load_wall,
+            self.configure_calls, self.configure_wall,
+            self.max_configure_wall)
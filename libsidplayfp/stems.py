@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+from concurrent.futures import ThreadPoolExecutor
+
+from libsidplayfp.batch import create_player
+
+
+VOICES_PER_SID = 3
+# tunes use at most three sids
+_MAX_VOICES = 3 * VOICES_PER_SID
+
+
+class StemRenderer:
+    """
+    Render every voice of a tune into a separate buffer (a stem).
+
+    libsidplayfp mixes all voices inside the emulation, so stems can not be
+    taken from a single engine. Instead one engine is used per voice, with
+    all other voices muted, and all engines render in parallel threads.
+    Engines are created with :py:func:`~libsidplayfp.batch.create_player`
+    and ``player_options`` on first use and reused for later tunes.
+    """
+
+    def __init__(self, threads=None, **player_options):
+        self.player_options = player_options
+        self.threads = threads
+        self._players = []
+        self._executor = None
+
+    def _get_players(self, count):
+        while len(self._players) < count:
+            self._players.append(create_player(**self.player_options))
+        return self._players[:count]
+
+    def render(self, tune, seconds, song=None):
+        """
+        Render ``seconds`` of ``song`` (by default the selected song) of
+        ``tune``. Returns an int16 numpy array of shape ``(voices, samples)``
+        (``(voices, samples, 2)`` for stereo playback) with the voices of
+        the first sid followed by those of the second and third sid.
+        """
+        import numpy as np
+
+        voices = [(sid, voice)
+                  for sid in range(tune.get_info().sid_chips)
+                  for voice in range(VOICES_PER_SID)]
+        players = self._get_players(len(voices))
+
+        # selecting a song changes the tune, so load all engines before
+        # any of them starts rendering
+        if song is not None:
+            tune.select_song(song)
+        for player, unmuted in zip(players, voices):
+            player.load(tune)
+            for sid, voice in voices:
+                player.mute(sid, voice, (sid, voice) != unmuted)
+
+        config = players[0].config
+        channels = config.playback.value
+        frames = int(seconds * config.frequency)
+        stems = np.zeros((len(voices), frames * channels), np.int16)
+
+        def render(i):
+            return players[i].render(out=stems[i])[1]
+
+        if self._executor is None:
+            # sized for tunes with three sids, as later tunes may use more
+            # sids than this one; threads are only started when needed
+            self._executor = ThreadPoolExecutor(
+                self.threads or _MAX_VOICES, thread_name_prefix='stems')
+        counts = list(self._executor.map(render, range(len(voices))))
+
+        stems = stems[:, :min(counts)]
+        if channels > 1:
+            stems = stems.reshape(len(voices), -1, channels)
+        return stems
+
+    def close(self):
+        """Shut down the rendering threads and release the engines."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._players = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def render_stems(tune, seconds, song=None, threads=None, **player_options):
+    """
+    Render each voice of ``tune`` into a separate buffer using a temporary
+    :py:class:`StemRenderer`. Returns an int16 numpy array of shape
+    ``(voices, samples)``.
+    """
+    with StemRenderer(threads, **player_options) as renderer:
+        return renderer.render(tune, seconds, song)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import os
+import sys
+
+import pytest
+
+# the synthetic tunes of the benchmarks are used, so no tunes are needed
+sys.path.insert(0, os.path.join(
+    os.path.dirname(__file__), os.pardir, 'benchmarks'))
+import synth  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def tune_paths(tmp_path_factory):
+    """Paths (as bytes) of synthetic tunes using one to three sids."""
+    directory = str(tmp_path_factory.mktemp('tunes'))
+    paths = []
+    for sids in (1, 2, 3):
+        paths += synth.write_tunes(directory, 3, sids=sids, songs=2)
+    return [os.fsencode(path) for path in paths]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+PSID and RSID files generated from the synthetic tunes of the benchmarks,
+covering the header fields the parsers handle differently.
+"""
+import struct
+
+import synth
+
+
+def patch(data, offset, fmt, value):
+    """Return ``data`` with ``value`` packed at ``offset``."""
+    data = bytearray(data)
+    struct.pack_into(fmt, data, offset, value)
+    return bytes(data)
+
+
+def with_speed(data, speed):
+    return patch(data, 0x12, '>I', speed)
+
+
+def with_flags(data, flags):
+    return patch(data, 0x76, '>H', flags)
+
+
+def psid_v1(data):
+    # PSID v1 has no flags etc. and the data starts at $76
+    data = patch(patch(data, 0x04, '>H', 1), 0x06, '>H', 0x76)
+    return data[:0x76] + data[0x7c:]
+
+
+def rsid(data):
+    # RSID tunes have no play address and speed
+    return b'RSID' + with_speed(patch(data, 0x0c, '>H', 0), 0)[4:]
+
+
+def _tunes():
+    tunes = {}
+    for sids in (1, 2, 3):
+        for songs in (1, 3, 40):
+            tunes['{}sid_{}songs'.format(sids, songs)] = synth.psid(
+                sids, songs)
+
+    many = synth.psid(1, 40)
+    for speed in (1, 0x80000000, 0x80000001, 0x55555555, 0xffffffff):
+        tunes['speed_{:08x}'.format(speed)] = with_speed(many, speed)
+        # PSID specific tunes use bit 0 again for song 33
+        tunes['specific_{:08x}'.format(speed)] = with_flags(
+            with_speed(many, speed), 0x16)
+        tunes['v1_{:08x}'.format(speed)] = psid_v1(with_speed(many, speed))
+
+    for flags in (0x04, 0x08, 0x0c, 0x20, 0x30):
+        tunes['flags_{:02x}'.format(flags)] = with_flags(many, flags)
+
+    tunes['rsid'] = rsid(synth.psid(1, 3))
+    tunes['rsid_3sid'] = rsid(synth.psid(3, 1))
+    return tunes
+
+
+# valid tunes by name
+TUNES = _tunes()
+
+# files rejected by libsidplayfp by name
+INVALID = {
+    'mus': with_flags(synth.psid(), 0x15),
+    'truncated': synth.psid()[:0x50],
+    'version_5': patch(synth.psid(), 0x04, '>H', 5),
+    'rsid_speed': with_speed(rsid(synth.psid()), 1),
+    'rsid_play': patch(rsid(synth.psid()), 0x0c, '>H', 0x1010),
+    'rsid_basic_init': with_flags(rsid(synth.psid()), 0x16),
+    'no_data': synth.psid()[:0x7c],
+}
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Switch the emulation of an engine while a tune is loaded. The engine must
+keep working after the builder of its old sids was replaced.
+"""
+import gc
+
+import pytest
+
+pytest.importorskip('libsidplayfp._libsidplayfp')
+
+from libsidplayfp import SamplingMethod, SidTune  # noqa: E402
+from libsidplayfp.adaptive import (  # noqa: E402
+    QualityController, QualityLevel)
+from libsidplayfp.batch import create_player  # noqa: E402
+
+import synth  # noqa: E402
+
+
+LEVELS = (
+    QualityLevel('residfp', SamplingMethod.INTERPOLATE, False, None),
+    QualityLevel('resid', SamplingMethod.INTERPOLATE, False, None),
+)
+
+
+@pytest.fixture
+def controller():
+    player = create_player(emulation='residfp', sids=3)
+    controller = QualityController(player, LEVELS)
+    controller.load(SidTune(source_buffer=synth.psid(sids=3, songs=2)))
+    return controller
+
+
+def _render(player):
+    gc.collect()
+    out, count, _ = player.render(seconds=0.5)
+    assert count == len(out)
+    assert any(out)
+
+
+def test_apply(controller):
+    for level in (1, 0, 1):
+        controller.pending = level
+        assert controller.apply()
+        assert controller.level == level
+        _render(controller.player)
+
+
+def test_load(controller):
+    _render(controller.player)
+    controller.pending = 1
+    controller.load(controller.player._current_tune, 2)
+    assert controller.level == 1
+    _render(controller.player)
+
+
+def test_immediate(controller):
+    player = controller.player
+    controller.immediate = True
+    _render(player)
+
+    position = player.time_ms
+    controller.pending = 1
+    controller.observe(controller.window, 1.0)
+    assert controller.level == 1
+    assert player.time_ms >= position
+    _render(player)
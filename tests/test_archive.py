@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Build and read tune archives. These tests do not need the compiled
+extension module.
+"""
+import os
+import subprocess
+import sys
+
+from libsidplayfp.archive import TuneArchive, build_archive
+
+import synth
+
+
+def _tree(root):
+    synth.write_tunes(os.path.join(root, 'B'), 2)
+    synth.write_tunes(os.path.join(root, 'A', 'Sub'), 1, sids=2)
+    with open(os.path.join(root, 'A', 'readme.txt'), 'w') as f:
+        f.write('not a tune')
+
+
+def test_build(tmp_path):
+    root = str(tmp_path / 'C64Music')
+    _tree(root)
+    filename = tmp_path / 'tunes.pack'
+    assert build_archive(filename, root) == 3
+
+    with TuneArchive(filename) as archive:
+        assert archive.names() == [
+            'A/Sub/synth_2sid_0000.sid', 'B/synth_1sid_0000.sid',
+            'B/synth_1sid_0001.sid']
+        with archive.data('B/synth_1sid_0001.sid') as data:
+            assert data == synth.psid(1, seed=1)
+
+
+def test_no_extension(tmp_path):
+    root = str(tmp_path / 'C64Music')
+    _tree(root)
+    # a fresh interpreter, as other tests may have loaded the extension
+    code = ('import sys; from libsidplayfp.archive import build_archive; '
+            'build_archive(sys.argv[1], sys.argv[2]); '
+            'print("libsidplayfp._libsidplayfp" in sys.modules)')
+    output = subprocess.check_output(
+        [sys.executable, '-c', code, str(tmp_path / 'tunes.pack'), root])
+    assert output.strip() == b'False'
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+The metadata cache must not store records of files which changed after
+their tune was read.
+"""
+import os
+
+import pytest
+
+from libsidplayfp.cache import MetadataCache, file_stat
+
+import synth
+
+
+def _touch(path, data):
+    stat = os.stat(path)
+    with open(path, 'wb') as f:
+        f.write(data)
+    # make sure the modification time differs on coarse file systems
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+def test_put_changed_file(tmp_path):
+    path = tmp_path / 'tune.sid'
+    path.write_bytes(synth.psid(seed=1))
+    stat = file_stat(path)
+    _touch(path, synth.psid(seed=2))
+
+    with MetadataCache() as cache:
+        cache.put(path, object(), stat)
+        assert cache.get(path) is None
+        assert cache.get(path, stat) is None
+
+
+def test_create_MD5_changed_file(tmp_path):
+    pytest.importorskip('libsidplayfp._libsidplayfp')
+    from libsidplayfp import SidTune
+
+    path = tmp_path / 'tune.sid'
+    path.write_bytes(synth.psid(seed=1))
+    with MetadataCache() as cache:
+        tune = SidTune(os.fsencode(path), cache=cache)
+        md5 = SidTune(os.fsencode(path)).create_MD5()
+        _touch(path, synth.psid(seed=2))
+
+        assert tune.create_MD5() == md5
+        assert cache.get(path) is None
+
+        new_tune = SidTune(os.fsencode(path), cache=cache)
+        assert new_tune.create_MD5() == cache.get(path).md5
+        assert tune.create_MD5() == md5
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Look up tunes added to a TunePool without a key by their MD5.
+"""
+import pytest
+
+pytest.importorskip('libsidplayfp._libsidplayfp')
+
+from libsidplayfp import SidTune  # noqa: E402
+from libsidplayfp.pool import TunePool  # noqa: E402
+
+import synth  # noqa: E402
+
+
+def test_add_without_key():
+    pool = TunePool()
+    tune = SidTune(source_buffer=synth.psid())
+    md5 = tune.create_MD5()
+    pool.add(tune)
+
+    assert md5 in pool
+    assert md5.decode('ascii') in pool
+    assert pool.get(md5) is tune
+    assert pool.get_md5(md5) is tune
+    assert pool.size == tune.get_info().data_file_len
+
+    pool.invalidate(md5)
+    assert md5 not in pool
+    assert len(pool) == 0
+    assert pool.size == 0
+
+
+def test_add_with_key(tmp_path):
+    pool = TunePool()
+    tune = SidTune(source_buffer=synth.psid())
+    path = tmp_path / 'tune.sid'
+    pool.add(tune, path)
+
+    assert path in pool
+    assert str(path) in pool
+    assert pool.get(path) is tune
+    assert tune.create_MD5() not in pool
+    pool.invalidate(path)
+    assert len(pool) == 0
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Parse PSID and RSID headers in pure Python. These tests do not need the
+compiled extension module.
+"""
+import hashlib
+import subprocess
+import sys
+
+import pytest
+
+from libsidplayfp.errors import SidTuneError
+from libsidplayfp.psid import (
+    COMPATIBILITY_BASIC, COMPATIBILITY_C64, COMPATIBILITY_PSID,
+    COMPATIBILITY_R64, SPEED_CIA_1A, SPEED_VBI, create_MD5_new, parse_psid)
+
+import synth
+from psid_tunes import (
+    INVALID, TUNES, patch, psid_v1, rsid, with_flags, with_speed)
+
+
+def _speeds(info):
+    return ''.join('C' if speed == SPEED_CIA_1A else 'V'
+                   for speed in info.song_speeds)
+
+
+def test_no_extension():
+    # a fresh interpreter, as other tests may have loaded the extension
+    code = ('import sys, libsidplayfp.psid; '
+            'print("libsidplayfp._libsidplayfp" in sys.modules)')
+    output = subprocess.check_output([sys.executable, '-c', code])
+    assert output.strip() == b'False'
+
+
+@pytest.mark.parametrize('name', sorted(TUNES))
+def test_valid(name):
+    data = TUNES[name]
+    info = parse_psid(data, path='tune.sid')
+    assert info.path == 'tune.sid'
+    assert info.data_file_len == len(data)
+    assert create_MD5_new(data) == hashlib.md5(data).hexdigest().encode()
+
+
+@pytest.mark.parametrize('name', sorted(INVALID))
+def test_invalid(name):
+    with pytest.raises(SidTuneError):
+        parse_psid(INVALID[name])
+
+
+@pytest.mark.parametrize('sids', [1, 2, 3])
+def test_sid_chips(sids):
+    info = parse_psid(synth.psid(sids))
+    assert info.sid_chips == sids
+    assert info.sid_chip_bases == synth.SID_BASES[:sids]
+    assert info.info_strings == (
+        'Synthetic {}SID #0'.format(sids).encode(), b'libsidplayfp-python',
+        b'benchmarks')
+    assert info.load_addr == synth.LOAD_ADDR
+    assert info.init_addr == synth.LOAD_ADDR
+    assert info.compatibility == COMPATIBILITY_C64
+    assert info.version == 4
+
+
+def test_song_speeds():
+    tune = with_speed(synth.psid(1, 40), 0x80000001)
+    # all songs after the 32nd use the speed of the 32nd ...
+    info = parse_psid(tune)
+    assert info.songs == 40
+    assert _speeds(info) == 'C' + 'V' * 30 + 'C' * 9
+    # ... except for PSID specific tunes, which start again with bit 0
+    for specific in (with_flags(tune, 0x16), psid_v1(tune)):
+        info = parse_psid(specific)
+        assert info.compatibility == COMPATIBILITY_PSID
+        assert _speeds(info) == ('C' + 'V' * 30 + 'C') + ('C' + 'V' * 7)
+
+
+def test_song_speeds_md5():
+    tune = synth.psid(1, 40)
+    speed_33 = with_flags(with_speed(tune, 1 << 31), 0x16)
+    speed_1 = with_flags(with_speed(tune, 1 << 31 | 1), 0x16)
+    assert parse_psid(speed_33).md5 != parse_psid(speed_1).md5
+
+
+def test_songs():
+    info = parse_psid(patch(synth.psid(1, 3), 0x10, '>H', 4))
+    assert info.start_song == 1
+    info = parse_psid(patch(synth.psid(1, 300), 0x10, '>H', 2))
+    assert info.songs == 256
+    assert info.start_song == 2
+
+
+def test_rsid():
+    info = parse_psid(rsid(synth.psid(1, 3)))
+    assert info.compatibility == COMPATIBILITY_R64
+    assert _speeds(info) == 'CCC'
+
+    # BASIC tunes have no init address
+    basic = with_flags(patch(rsid(synth.psid()), 0x0a, '>H', 0), 0x16)
+    assert parse_psid(basic).compatibility == COMPATIBILITY_BASIC
+
+    low = rsid(synth.psid())
+    low = low[:0x7c] + bytes([0x00, 0x07]) + low[0x7e:]
+    with pytest.raises(SidTuneError):
+        parse_psid(patch(low, 0x0a, '>H', 0x0700))
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Cross-check the pure Python PSID parser with the information and the MD5s
+libsidplayfp reports for the same files.
+"""
+import pytest
+
+pytest.importorskip('libsidplayfp._libsidplayfp')
+
+from libsidplayfp import SidTune, SidTuneError  # noqa: E402
+from libsidplayfp.psid import create_MD5_new, parse_psid  # noqa: E402
+from libsidplayfp.scan import scan_tune  # noqa: E402
+
+from psid_tunes import INVALID, TUNES  # noqa: E402
+
+
+@pytest.mark.parametrize('name', sorted(TUNES))
+def test_parse_psid(name):
+    data = TUNES[name]
+    record = scan_tune(SidTune(source_buffer=data))
+    expected = record._replace(
+        sid_models=tuple(model.value for model in record.sid_models),
+        compatibility=record.compatibility.value,
+        clock_speed=record.clock_speed.value)
+
+    info = parse_psid(data)
+    assert info[:-1] == tuple(expected)
+
+
+@pytest.mark.parametrize('name', sorted(TUNES))
+def test_create_MD5_new(name):
+    data = TUNES[name]
+    assert create_MD5_new(data) == SidTune(source_buffer=data).create_MD5_new()
+
+
+@pytest.mark.parametrize('name', sorted(INVALID))
+def test_invalid(name):
+    with pytest.raises(SidTuneError):
+        SidTune(source_buffer=INVALID[name])
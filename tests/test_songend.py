@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Find the end of a song in the peaks and register hashes collected while
+playing it.
+"""
+import pytest
+
+pytest.importorskip('libsidplayfp._libsidplayfp')
+
+from libsidplayfp.songend import _Analysis  # noqa: E402
+
+
+# 150 steps per second: 3 seconds of silence, 10 seconds minimum loop
+# length and 30 seconds to match
+SILENCE_STEPS = 450
+
+
+def _analysis():
+    return _Analysis(SILENCE_STEPS, 64, 1500, 4500)
+
+
+def test_silent_intro():
+    analysis = _analysis()
+    assert analysis.add([1] * 525, [0] * 525) is None
+    assert analysis.add([2] * 150, [1000] * 150) is None
+    assert analysis.add([3] * 450, [0] * 450) == (675, 'silence', None)
+
+
+def test_silence():
+    analysis = _analysis()
+    assert analysis.add([1] * 150, [1000] * 150) is None
+    assert analysis.add([2] * 449, [64] * 449) is None
+    assert analysis.add([2], [0]) == (150, 'silence', None)
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Parse, save and load songlength databases with SongLengthIndex. These tests
+do not need the compiled extension module.
+"""
+import pickle
+import struct
+from types import SimpleNamespace
+
+import pytest
+
+from libsidplayfp.errors import SidDatabaseError
+from libsidplayfp import songlength
+from libsidplayfp.songlength import SongLengthIndex
+
+
+MD5_A = '0123456789abcdef0123456789abcdef'
+MD5_B = 'fedcba9876543210fedcba9876543210'
+MD5_C = '00000000000000000000000000000001'
+MD5_UNKNOWN = 'ffffffffffffffffffffffffffffffff'
+
+DATABASE = '''\
+[Database]
+; /MUSICIANS/A/Tune_A.sid
+{a}=3:25 0:41.37(G) 0:09.9
+; /MUSICIANS/B/Tune_B.sid
+{b}=1:00.000(M)(Z)
+
+{c}=0:01.5
+; duplicate entries are ignored
+{a}=9:99
+'''.format(a=MD5_A, b=MD5_B.upper(), c=MD5_C)
+
+LENGTHS = {
+    (MD5_A, 1): 205000,
+    (MD5_A, 2): 41370,
+    (MD5_A, 3): 9900,
+    (MD5_B, 1): 60000,
+    (MD5_C, 1): 1500,
+}
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / 'Songlengths.md5'
+    path.write_text(DATABASE)
+    return path
+
+
+def _check(index):
+    assert len(index) == 3
+    for (md5, song), length in LENGTHS.items():
+        assert md5 in index
+        assert md5.encode() in index
+        assert index.length_ms(md5, song) == length
+    assert MD5_UNKNOWN not in index
+    assert index.length(MD5_A, 2) == 41
+    with pytest.raises(SidDatabaseError):
+        index.length_ms(MD5_A, 4)
+    with pytest.raises(SidDatabaseError):
+        index.length_ms(MD5_UNKNOWN, 1)
+
+
+def test_parse(database):
+    index = SongLengthIndex(database)
+    assert index.new_md5
+    _check(index)
+
+
+@pytest.mark.parametrize('time, ms', [
+    ('3:25', 205000), ('0:41.37', 41370), ('0:09.9(G)', 9900),
+    ('12:00.1234', 720123), ('1:00.000(M)(Z)', 60000)])
+def test_parse_time(time, ms):
+    assert songlength.parse_time(time) == ms
+
+
+@pytest.mark.parametrize('line', [
+    MD5_A, 'abc=1:00', '{}=1:00 x'.format(MD5_A), '{}=1:00(G'.format(MD5_A)])
+def test_invalid_database(tmp_path, line):
+    path = tmp_path / 'Songlengths.md5'
+    path.write_text('[Database]\n' + line + '\n')
+    with pytest.raises(SidDatabaseError):
+        SongLengthIndex(path)
+
+
+def test_old_md5(tmp_path):
+    path = tmp_path / 'Songlengths.txt'
+    path.write_text(DATABASE)
+    index = SongLengthIndex(path)
+    assert not index.new_md5
+    assert SongLengthIndex(path, new_md5=True).new_md5
+
+
+def test_tune(database):
+    tune = SimpleNamespace(
+        create_MD5=lambda: MD5_B.encode(),
+        create_MD5_new=lambda: MD5_A.encode(),
+        get_info=lambda: SimpleNamespace(current_song=2))
+    assert SongLengthIndex(database).length_ms(tune) == 41370
+    with pytest.raises(SidDatabaseError):
+        # song 2 of the tune with the old MD5 is unknown
+        SongLengthIndex(database, new_md5=False).length_ms(tune)
+
+
+def test_lengths_ms(database):
+    index = SongLengthIndex(database)
+    md5s = [MD5_A, MD5_B.encode(), 'not an md5', b'\xff', MD5_UNKNOWN,
+            MD5_A[:-2]]
+    assert list(index.lengths_ms(md5s)) == [205000, 60000, -1, -1, -1, -1]
+    assert list(index.lengths_ms([MD5_A, MD5_A, MD5_B], [3, 4, 1])) == [
+        9900, -1, 60000]
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_save_load(database, tmp_path, use_mmap):
+    path = tmp_path / 'index.bin'
+    SongLengthIndex(database, new_md5=False).save(path)
+    index = SongLengthIndex.load(path, use_mmap=use_mmap)
+    assert not index.new_md5
+    _check(index)
+
+    # pickling copies the memory-mapped arrays
+    _check(pickle.loads(pickle.dumps(index)))
+    index.close()
+    assert len(index) == 0
+    assert MD5_A not in index
+
+
+def test_byte_swap(database, tmp_path, monkeypatch):
+    path = tmp_path / 'index.bin'
+    SongLengthIndex(database).save(path)
+    data = path.read_bytes()
+
+    monkeypatch.setattr(songlength.sys, 'byteorder', 'big')
+    SongLengthIndex(database).save(path)
+    assert path.read_bytes() != data
+    _check(SongLengthIndex.load(path))
+
+
+def test_pickle(database):
+    _check(pickle.loads(pickle.dumps(SongLengthIndex(database))))
+
+
+def test_empty(tmp_path):
+    path = tmp_path / 'Songlengths.md5'
+    path.write_text('[Database]\n')
+    index = SongLengthIndex(path)
+    assert len(index) == 0
+    assert MD5_A not in index
+
+    path = tmp_path / 'index.bin'
+    index.save(path)
+    assert len(SongLengthIndex.load(path)) == 0
+
+
+def _corrupt(data):
+    header = songlength._HEADER
+    magic, count, total, slots, flags = header.unpack_from(data)
+    yield b''
+    yield data[:header.size - 1]
+    yield data[:-4]
+    yield data + bytes(4)
+    yield b'SLIDX1\0\0' + data[8:]
+    for fields in ((count, total, slots - 1), (count, total, count),
+                   (count + 1, total, slots)):
+        yield header.pack(magic, *fields, flags) + data[header.size:]
+
+
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_load_invalid(database, tmp_path, use_mmap):
+    path = tmp_path / 'index.bin'
+    SongLengthIndex(database).save(path)
+    for data in _corrupt(path.read_bytes()):
+        path.write_bytes(data)
+        with pytest.raises(SidDatabaseError):
+            SongLengthIndex.load(path, use_mmap=use_mmap)
+
+    with pytest.raises(SidDatabaseError):
+        SongLengthIndex.load(tmp_path / 'missing.bin')
+
+
+def test_damaged_arrays(database, tmp_path):
+    path = tmp_path / 'index.bin'
+    SongLengthIndex(database).save(path)
+    header = songlength._HEADER
+    data = bytearray(path.read_bytes())
+    magic, count, total, slots, flags = header.unpack_from(data)
+    table = header.size + count * 16
+    offsets = table + slots * 4
+
+    # a table without empty slots must not loop forever
+    full = bytearray(data)
+    full[table:offsets] = struct.pack('<I', count) * slots
+    path.write_bytes(full)
+    index = SongLengthIndex.load(path, use_mmap=False)
+    assert MD5_UNKNOWN not in index
+    assert MD5_A not in index
+
+    # song lengths outside of the array
+    struct.pack_into('<I', data, offsets + 4, total + 1)
+    path.write_bytes(data)
+    index = SongLengthIndex.load(path, use_mmap=False)
+    with pytest.raises(SidDatabaseError):
+        index.lengths_ms([MD5_A, MD5_B, MD5_C])
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Instrument a player with several PlayerStats at once.
+"""
+from array import array
+
+import pytest
+
+pytest.importorskip('libsidplayfp._libsidplayfp')
+
+from libsidplayfp import SidTune  # noqa: E402
+from libsidplayfp.batch import create_player  # noqa: E402
+from libsidplayfp.stats import PlayerStats  # noqa: E402
+
+import synth  # noqa: E402
+
+
+@pytest.fixture
+def player():
+    player = create_player()
+    player.load(SidTune(source_buffer=synth.psid()))
+    return player
+
+
+def test_nested(player):
+    outer = PlayerStats(player)
+    inner = PlayerStats(player)
+    with outer:
+        with inner:
+            player.render(seconds=0.1)
+        assert not inner.attached
+        player.play(array('h', bytes(2000)))
+
+    assert outer.play_calls == 2
+    assert inner.play_calls == 1
+    assert 'play' not in player.__dict__
+    assert 'render' not in player.__dict__
+
+
+def test_render_request(player):
+    with PlayerStats(player) as stats:
+        player.render(seconds=0.1)
+        player.render(samples=1000)
+        player.render(out=array('h', bytes(2000)))
+    assert stats.play_calls == 3
+    assert stats.samples == 4410 + 1000 + 1000
+    assert stats.short_calls == 0
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Render the voices of tunes with different numbers of sids into stems.
+"""
+import threading
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('libsidplayfp._libsidplayfp')
+
+from libsidplayfp import SidTune  # noqa: E402
+from libsidplayfp.stems import StemRenderer  # noqa: E402
+
+import synth  # noqa: E402
+
+
+def test_more_sids_later():
+    with StemRenderer() as renderer:
+        stems = renderer.render(SidTune(source_buffer=synth.psid(1)), 0.1)
+        assert stems.shape == (3, 4410)
+
+        # all nine voices of a later 3SID tune render in parallel
+        barrier = threading.Barrier(9, timeout=10)
+        for player in renderer._get_players(9):
+            render = player.render
+
+            def wait_and_render(*args, render=render, **kwargs):
+                barrier.wait()
+                return render(*args, **kwargs)
+
+            player.render = wait_and_render
+        stems = renderer.render(SidTune(source_buffer=synth.psid(3)), 0.1)
+        assert stems.shape == (9, 4410)
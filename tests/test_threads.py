@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+Stress tests rendering from several threads at once. The output has to be
+the same as when rendering the tunes one after another.
+"""
+import hashlib
+import threading
+
+import pytest
+
+pytest.importorskip('libsidplayfp._libsidplayfp')
+
+from libsidplayfp import SidTune  # noqa: E402
+from libsidplayfp.batch import (  # noqa: E402
+    create_player, render_threaded, render_subtunes)
+
+
+SECONDS = 2
+THREADS = (2, 4, 8)
+
+
+def _digest(samples):
+    return hashlib.sha1(samples).hexdigest()
+
+
+@pytest.fixture(scope='module')
+def jobs(tune_paths):
+    return [(path, song) for path in tune_paths for song in (1, 2)]
+
+
+@pytest.fixture(scope='module')
+def reference(jobs):
+    """Digests of all jobs rendered one after another by a single engine."""
+    player = create_player()
+    digests = {}
+    for path, song in jobs:
+        player.reset(SidTune(path), song)
+        samples, count, _ = player.render(SECONDS)
+        digests[path, song] = _digest(memoryview(samples)[:count])
+    return digests
+
+
+@pytest.mark.parametrize('threads', THREADS)
+def test_render_threaded(jobs, reference, threads):
+    # every job several times, so all threads render at the same time
+    results = list(render_threaded(
+        jobs * threads, SECONDS, threads, handler=_digest))
+
+    assert len(results) == len(jobs) * threads
+    for result, job in zip(results, jobs * threads):
+        assert result.error is None
+        assert (result.path, result.song) == job
+        assert result.result == reference[job]
+
+
+@pytest.mark.parametrize('threads', THREADS)
+def test_engine_per_thread(jobs, reference, threads):
+    # every thread creates its own engine and renders all jobs; the
+    # barrier makes them start rendering at the same time
+    barrier = threading.Barrier(threads)
+    failures = []
+
+    def run():
+        try:
+            player = create_player()
+            barrier.wait()
+            for path, song in jobs:
+                player.reset(SidTune(path), song)
+                samples, count, _ = player.render(SECONDS)
+                digest = _digest(memoryview(samples)[:count])
+                if digest != reference[path, song]:
+                    failures.append((path, song))
+        except Exception as e:
+            failures.append(e)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert failures == []
+
+
+@pytest.mark.parametrize('threads', THREADS)
+def test_render_subtunes(tune_paths, reference, threads):
+    # all threads share a single SidTune
+    path = tune_paths[-1]
+    songs = [1, 2] * threads
+    results = render_subtunes(
+        SidTune(path), SECONDS, songs, threads, handler=_digest)
+
+    assert [result.song for result in results] == songs
+    for result in results:
+        assert result.error is None
+        assert result.result == reference[path, result.song]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# This file is part of libsidplyfp(-python), a Python wrapper to
+# libsidplayfp, a SID player engine.
+
+# Copyright (C) 2017 Maximilian Timmerkamp
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import gc
+
+import pytest
+
+pytest.importorskip('libsidplayfp._libsidplayfp')
+numpy = pytest.importorskip('numpy')
+
+from libsidplayfp import SidTune, lib  # noqa: E402
+from libsidplayfp.batch import create_player  # noqa: E402
+
+pytestmark = pytest.mark.skipif(
+    not lib.SidTrace_supported(),
+    reason='register tracing requires libsidplayfp 2.2 or newer')
+
+
+@pytest.fixture
+def player(tune_paths):
+    player = create_player()
+    player.load(SidTune(tune_paths[-1]))
+    return player
+
+
+def test_to_numpy_outlives_trace(player):
+    writes = player.trace(5).to_numpy()
+    # the temporary trace is freed, reuse its memory
+    gc.collect()
+    garbage = [bytearray(b'\xff' * len(writes) * 8) for _ in range(16)]
+
+    player.reset()
+    expected = player.trace(5).to_numpy()
+    del garbage
+    # compare the fields, the padding byte of the records is undefined
+    assert len(expected) > 0
+    assert numpy.array_equal(writes, expected)
+
+
+def test_to_numpy_survives_append(player):
+    trace = player.trace(1)
+    writes = trace.to_numpy()
+    expected = writes.copy()
+
+    # appending moves the records of the trace
+    player.trace(20, trace=trace)
+    assert len(trace) > len(writes) > 0
+    assert numpy.array_equal(writes, expected)
+    assert numpy.array_equal(trace.to_numpy()[:len(writes)], expected)